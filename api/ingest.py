@@ -1,37 +1,690 @@
 import os
-from flask import Flask, request, jsonify
+import re
+import sys
+import math
+import zlib
+import json
+import bisect
+import logging
+import contextvars
+import time
+import uuid
+import heapq
+import random
+import hashlib
+import functools
+import itertools
+import sqlite3
+import multiprocessing
+import tempfile
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+from flask import Flask, Response, request, jsonify
 import requests
 import fitz  # PyMuPDF
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 import openai
+import numpy as np
+
+# Sibling modules, when the runtime loads this file by path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pdf_extract import extract_pages, page_text  # noqa: E402
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# tiktoken downloads its encoding on first use; a copy fetched into api/tiktoken_cache at
+# deploy time (see README) ships with the function instead
+_TIKTOKEN_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tiktoken_cache')
+if os.path.isdir(_TIKTOKEN_CACHE):
+    os.environ.setdefault('TIKTOKEN_CACHE_DIR', _TIKTOKEN_CACHE)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 # Initialize Flask and OpenAI
 app = Flask(__name__)
 openai.api_key = os.environ.get('OPENAI_API_KEY')
 MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4.1')
+# Bump whenever the prompt changes so stale summaries are not served from cache
+PROMPT_VERSION = '2'
 
+# Summary cache: memory, sqlite, redis or none
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHE_PATH = os.environ.get('CACHE_PATH', '/tmp/paper-summarizer-cache.sqlite3')
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 30 * 24 * 3600))
+# URLs can start serving new content (e.g. a new arXiv version), so expire them sooner
+CACHE_URL_TTL = int(os.environ.get('CACHE_URL_TTL', 24 * 3600))
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 
-def fetch_text(url: str) -> str:
-    """Download PDF or HTML and extract plain text."""
-    resp = requests.get(url)
-    resp.raise_for_status()
-    if url.lower().endswith('.pdf'):
-        doc = fitz.open(stream=resp.content, filetype='pdf')
-        return "\n".join(p.get_text() for p in doc)
-    # HTML page
-    return BeautifulSoup(resp.text, 'html.parser').get_text()
+# Text extraction: PDF pages are extracted in parallel, in batches, by a process pool
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.environ.get('PDF_PAGES_PER_TASK', 8))
+# Stop extracting once the prompt could not use any more text
+EXTRACT_MAX_PAGES = int(os.environ.get('EXTRACT_MAX_PAGES', 500))
+EXTRACT_MAX_CHARS = int(os.environ.get('EXTRACT_MAX_CHARS', 2_000_000))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# HTML landing pages with less text than this are swapped for their citation_pdf_url
+HTML_MIN_CHARS = int(os.environ.get('HTML_MIN_CHARS', 5_000))
 
+# Outbound HTTP goes through one keep-alive session with a bounded pool per host
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 30))
+HTTP_CONNECTIONS_PER_HOST = int(os.environ.get('HTTP_CONNECTIONS_PER_HOST', 8))
 
-@app.route('/api/ingest', methods=['POST'])
-def ingest():
-    data = request.get_json() or {}
-    url = data.get('url')
-    if not url:
-        return jsonify({'error': 'Missing url'}), 400
+# Summarization mode: single prompt, map-reduce over chunks, or auto by length
+SUMMARY_MODES = ('single', 'mapreduce', 'auto')
+SUMMARY_MODE = os.environ.get('SUMMARY_MODE', 'auto')
+MAPREDUCE_THRESHOLD_TOKENS = int(os.environ.get('MAPREDUCE_THRESHOLD_TOKENS', 60_000))
+CHUNK_TOKENS = int(os.environ.get('CHUNK_TOKENS', 8_000))
+MAP_CONCURRENCY = int(os.environ.get('MAP_CONCURRENCY', 8))
+CHARS_PER_TOKEN = 4
 
-    # Fetch and summarize
-    text = fetch_text(url)
-    prompt = f"""
+# Prompt budgets, in tokens of cleaned paper text, for single and map-reduce mode
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 100_000))
+MAPREDUCE_TOKEN_BUDGET = int(os.environ.get('MAPREDUCE_TOKEN_BUDGET', 400_000))
+
+# Background jobs for POST /api/ingest?async=1: memory or sqlite queue
+JOB_QUEUE = os.environ.get('JOB_QUEUE', 'memory')
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', '/tmp/paper-summarizer-jobs.sqlite3')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 4))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 2.0))
+# Running jobs whose worker stopped renewing its lease for this long are run again
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 120))
+# Finished jobs are kept this long for GET /api/jobs/<id>
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 24 * 3600))
+
+# Batch ingest: papers in flight across all batches, and URLs per request
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 32))
+BATCH_MAX_URLS = int(os.environ.get('BATCH_MAX_URLS', 1000))
+# OpenAI rate limits to stay under (0 disables); completions are budgeted up front
+LLM_TOKENS_PER_MINUTE = int(os.environ.get('LLM_TOKENS_PER_MINUTE', 0))
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get('LLM_REQUESTS_PER_MINUTE', 0))
+COMPLETION_TOKEN_ESTIMATE = int(os.environ.get('COMPLETION_TOKEN_ESTIMATE', 1_000))
+
+# Local search index over summaries; set INDEX_DIR empty to disable
+INDEX_DIR = os.environ.get('INDEX_DIR', '/tmp/paper-summarizer-index')
+INDEX_DIM = int(os.environ.get('INDEX_DIM', 1024))
+# Cosine similarity at which a fetched paper counts as one already summarized
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', 0.98))
+
+# Log each ingest's stage trace as one JSON line
+METRICS_LOG = os.environ.get('METRICS_LOG', '') in ('1', 'true')
+
+
+_SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_BYTES_BUCKETS = tuple(4 ** i for i in range(5, 15))  # 1 KiB .. 256 MiB
+_PAGES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+_TOKENS_BUCKETS = (100, 500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000,
+                   500_000, 1_000_000)
+
+
+class Metrics:
+    """Process-wide counters and histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, histograms: dict, counters: dict):
+        self.histograms = histograms  # name -> (help, bucket upper bounds)
+        self.counters = counters  # name -> help
+        self._values = {}  # (name, sorted label items) -> count, or bucket counts + [sum]
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self.histograms[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counts = self._values.setdefault(key, [0] * (len(buckets) + 1) + [0.0])
+            counts[bisect.bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self) -> str:
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: item[0])
+        lines = []
+        for name, help_text in sorted(self.counters.items()):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{_labels(labels)} {value}'
+                      for (metric, labels), value in values if metric == name]
+        for name, (help_text, buckets) in sorted(self.histograms.items()):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (metric, labels), counts in values:
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {counts[-1]}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: tuple, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+metrics = Metrics(
+    histograms={
+        'paper_stage_seconds': ('Duration of each ingest stage.', _SECONDS_BUCKETS),
+        'paper_ingest_seconds': ('End-to-end duration of an ingest.', _SECONDS_BUCKETS),
+        'paper_job_wait_seconds': ('Time jobs spent queued before running.', _SECONDS_BUCKETS),
+        'paper_download_bytes': ('Size of downloaded documents.', _BYTES_BUCKETS),
+        'paper_pdf_pages': ('Pages extracted per PDF.', _PAGES_BUCKETS),
+        'paper_llm_tokens': ('Tokens per chat call, by kind.', _TOKENS_BUCKETS),
+    },
+    counters={
+        'paper_llm_tokens_total': 'Tokens used by chat calls, by kind.',
+        'paper_cache_total': 'Summary cache lookups, by outcome.',
+        'paper_jobs_total': 'Async job events, by outcome.',
+        'paper_ingests_total': 'Ingests, by kind and status.',
+    },
+)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+trace_log = logging.getLogger('paper_summarizer.trace')
+if METRICS_LOG:
+    trace_log.setLevel(logging.INFO)
+    trace_log.addHandler(logging.StreamHandler())
+
+
+@contextmanager
+def trace(stage: str, timings: dict = None):
+    """Time a stage into the stage histogram, the current ingest's trace and timings.
+
+    Callers may add fields (bytes, pages, tokens) to the yielded span.
+    """
+    span = {'stage': stage}
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span['seconds'] = round(time.perf_counter() - started, 3)
+        metrics.observe('paper_stage_seconds', span['seconds'], stage=stage)
+        if timings is not None:
+            timings[stage] = span['seconds']
+        record = _current_trace.get()
+        if record is not None:
+            record['spans'].append(span)
+
+
+@contextmanager
+def traced_ingest(kind: str, **fields):
+    """Collect the spans of one ingest; logged as a JSON line when METRICS_LOG is set."""
+    record = {'kind': kind, **fields, 'spans': []}
+    outer = _current_trace.get()
+    _current_trace.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+        record['status'] = 'ok'
+    except BaseException as exc:
+        record['status'] = 'error'
+        record['error'] = f'{type(exc).__name__}: {exc}'
+        raise
+    finally:
+        # set() rather than reset(): a streaming generator may finish in another context
+        _current_trace.set(outer)
+        record['seconds'] = round(time.perf_counter() - started, 3)
+        metrics.observe('paper_ingest_seconds', record['seconds'], kind=kind)
+        metrics.inc('paper_ingests_total', kind=kind, status=record['status'])
+        if 'cache' in record:
+            metrics.inc('paper_cache_total', outcome=record['cache'])
+        trace_log.info(json.dumps(record))
+
+
+def _in_context(func):
+    """Wrap func to run in a copy of the caller's context, for thread pools."""
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(func, *args)
+
+
+def _entry_size(key: str, value: str) -> int:
+    return len(key.encode()) + len(value.encode())
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL and a total size limit in bytes."""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl: int = CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires, value), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: str, ttl: int = None):
+        size = _entry_size(key, value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (time.time() + (ttl or self.ttl), value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._data)))
+
+    def _drop(self, key: str):
+        _, value = self._data.pop(key)
+        self._size -= _entry_size(key, value)
+
+
+class SQLiteCache:
+    """On-disk cache; evicts expired, then least recently read, entries past max_bytes."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: int = CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'expires REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: int = None):
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, size, expires, accessed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, value, size, now + (ttl or self.ttl), now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self._conn.execute('DELETE FROM cache WHERE expires < ?', (now,))
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        stale = []
+        for key, size in self._conn.execute('SELECT key, size FROM cache ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM cache WHERE key = ?', stale)
+
+
+class RedisCache:
+    """Cache on any client with Redis-style ``get``/``set(..., ex=)``.
+
+    Size-based eviction is delegated to the server (``maxmemory`` with an LRU policy).
+    """
+
+    def __init__(self, client, ttl: int = CACHE_TTL, prefix: str = 'paper-summarizer:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    def set(self, key: str, value: str, ttl: int = None):
+        self.client.set(self.prefix + key, value, ex=ttl or self.ttl)
+
+
+def make_cache(backend: str = CACHE_BACKEND):
+    """Build the configured cache backend, or None when caching is disabled."""
+    if backend == 'memory':
+        return MemoryCache()
+    if backend == 'sqlite':
+        return SQLiteCache()
+    if backend == 'redis':
+        import redis
+        return RedisCache(redis.Redis.from_url(REDIS_URL))
+    if backend == 'none':
+        return None
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+
+cache = make_cache()
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL for cache lookups (case, default ports, tracking params)."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.startswith('utm_')
+    ))
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), query, ''))
+
+
+def _make_session() -> requests.Session:
+    session = requests.Session()
+    # pool_block caps concurrent connections per host instead of opening throwaway ones
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=64, pool_maxsize=HTTP_CONNECTIONS_PER_HOST, pool_block=True,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+http = _make_session()
+
+
+def _download(url: str, fileobj):
+    """Stream the response body into fileobj without holding it in memory."""
+    with trace('download') as span, http.get(url, stream=True, timeout=HTTP_TIMEOUT) as resp:
+        resp.raise_for_status()
+        size = 0
+        for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+            fileobj.write(chunk)
+            size += len(chunk)
+        span['bytes'] = size
+        metrics.observe('paper_download_bytes', size)
+    fileobj.flush()
+    fileobj.seek(0)
+    return resp
+
+
+_pdf_pool = None
+_pdf_pool_unavailable = False
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool():
+    """Shared process pool, or None where multiprocessing is unavailable."""
+    global _pdf_pool, _pdf_pool_unavailable
+    with _pdf_pool_lock:
+        if _pdf_pool is None and PDF_WORKERS > 1 and not _pdf_pool_unavailable:
+            # Never fork: batch, worker and map threads may hold locks at that moment
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                'forkserver' if 'forkserver' in methods else 'spawn'
+            )
+            if context.get_start_method() == 'forkserver':
+                # Workers fork from a server that has loaded fitz but none of the app
+                context.set_forkserver_preload(['pdf_extract'])
+            try:
+                _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+            except (OSError, NotImplementedError):
+                # e.g. no /dev/shm on serverless runtimes; extract inline instead
+                _pdf_pool_unavailable = True
+        return _pdf_pool
+
+
+def _discard_pdf_pool(pool):
+    """Drop a broken pool so the next PDF starts a fresh one."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_pages(path: str, max_pages: int = EXTRACT_MAX_PAGES):
+    """Yield the text of each page in order, extracting batches of pages in parallel."""
+    with fitz.open(path) as doc:
+        count = min(doc.page_count, max_pages)
+        pool = _get_pdf_pool() if count > PDF_PAGES_PER_TASK else None
+        if pool is None:
+            for i in range(count):
+                yield page_text(doc[i])
+            return
+
+    batches = deque(
+        (start, min(start + PDF_PAGES_PER_TASK, count))
+        for start in range(0, count, PDF_PAGES_PER_TASK)
+    )
+    # Only keep a bounded window in flight so stopping early wastes little work
+    pending = deque()  # (start, stop, future)
+    try:
+        while batches or pending:
+            while batches and len(pending) < 2 * PDF_WORKERS:
+                pending.append((*batches[0], pool.submit(extract_pages, path, *batches[0])))
+                batches.popleft()
+            pages = pending[0][2].result()
+            pending.popleft()
+            yield from pages
+    except BrokenProcessPool:
+        # A worker died (a MuPDF crash, an OOM kill); finish this PDF inline
+        app.logger.warning('PDF worker pool broke; extracting %s inline', path)
+        _discard_pdf_pool(pool)
+        remaining = [(start, stop) for start, stop, _ in pending] + list(batches)
+        pending.clear()
+        for start, stop in remaining:
+            yield from extract_pages(path, start, stop)
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
+
+def _take_text(pages, max_chars: int = EXTRACT_MAX_CHARS) -> tuple:
+    """Join page texts until max_chars is reached, then stop consuming pages.
+
+    Returns the text and the number of pages used.
+    """
+    parts, total = [], 0
+    for page in pages:
+        if total + len(page) >= max_chars:
+            parts.append(page[:max_chars - total])
+            break
+        parts.append(page)
+        total += len(page) + 1
+    # Form feeds keep page boundaries for running header/footer removal
+    return "\f".join(parts), len(parts)
+
+
+# Site-specific handling: URL rewrites tried before download, and main-content finders by host
+URL_REWRITES = []
+CONTENT_FINDERS = {}
+
+
+def rewrites_url(func):
+    """Register func(url) -> better URL or None, e.g. a landing page to its PDF."""
+    URL_REWRITES.append(func)
+    return func
+
+
+def finds_content(*hosts):
+    """Register func(soup) -> main content element for pages on the given hosts."""
+    def register(func):
+        for host in hosts:
+            CONTENT_FINDERS[host] = func
+        return func
+    return register
+
+
+def resolve_url(url: str) -> str:
+    for rewrite in URL_REWRITES:
+        resolved = rewrite(url)
+        if resolved:
+            return resolved
+    return url
+
+
+@rewrites_url
+def _arxiv_abs_to_pdf(url: str):
+    parts = urlsplit(url)
+    if parts.hostname in ('arxiv.org', 'www.arxiv.org', 'export.arxiv.org') \
+            and parts.path.startswith('/abs/'):
+        return f"https://arxiv.org/pdf/{parts.path[len('/abs/'):].strip('/')}"
+
+
+@rewrites_url
+def _openreview_forum_to_pdf(url: str):
+    parts = urlsplit(url)
+    paper_id = dict(parse_qsl(parts.query)).get('id')
+    if parts.hostname == 'openreview.net' and parts.path == '/forum' and paper_id:
+        return f'https://openreview.net/pdf?id={paper_id}'
+
+
+_ACL_ID_RE = re.compile(r'^/([A-Z]\d{2}-\d{4}|\d{4}\.[\w-]+\.\d+)/?$')
+
+
+@rewrites_url
+def _acl_anthology_to_pdf(url: str):
+    parts = urlsplit(url)
+    match = _ACL_ID_RE.match(parts.path)
+    if parts.hostname == 'aclanthology.org' and match:
+        return f'https://aclanthology.org/{match.group(1)}.pdf'
+
+
+@finds_content('arxiv.org', 'www.arxiv.org', 'ar5iv.labs.arxiv.org', 'ar5iv.org')
+def _arxiv_html_content(soup):
+    return soup.select_one('article.ltx_document')
+
+
+_BOILERPLATE_TAGS = [
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'form', 'button',
+    'nav', 'header', 'footer', 'aside',
+]
+_BIBLIOGRAPHY_SELECTOR = (
+    '.ltx_bibliography, [role=doc-bibliography], #references, .references, #bibliography'
+)
+# Elements that start a new paragraph; clean_text finds headings by the blank line before them
+_BLOCK_TAGS = frozenset([
+    'address', 'article', 'blockquote', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section',
+    'table', 'tr', 'ul',
+])
+
+
+def _densest_block(soup):
+    """The element holding the most paragraph text (a cheap readability heuristic)."""
+    scores = {}
+    for p in soup.find_all('p'):
+        if p.parent is not None:
+            tag, score = scores.get(id(p.parent), (p.parent, 0))
+            scores[id(p.parent)] = (tag, score + len(p.get_text()))
+    tag, score = max(scores.values(), key=lambda item: item[1], default=(None, 0))
+    return tag if score >= 500 else None
+
+
+def _block_text(node) -> str:
+    """Text of node, one line per text run, with a blank line where each block element starts."""
+    lines = []
+    for item in node.descendants:
+        if isinstance(item, Tag):
+            if item.name in _BLOCK_TAGS and lines and lines[-1]:
+                lines.append('')
+        elif type(item) is NavigableString:  # not comments, doctypes or CDATA
+            text = item.strip()
+            if text:
+                lines.append(text)
+    return '\n'.join(lines).strip()
+
+
+def extract_html(soup, host: str = None) -> str:
+    """Main article text of a page, without scripts, navigation and references."""
+    for tag in soup(_BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.select(_BIBLIOGRAPHY_SELECTOR):
+        tag.decompose()
+    finder = CONTENT_FINDERS.get(host)
+    node = (
+        (finder(soup) if finder else None)
+        or soup.find('article')
+        or soup.find('main')
+        or soup.find(attrs={'role': 'main'})
+        or _densest_block(soup)
+        or soup.body
+        or soup
+    )
+    return _block_text(node)
+
+
+def fetch_text(url: str, stats: dict = None, follow_pdf: bool = True) -> str:
+    """Download PDF or HTML and extract plain text.
+
+    stats, if given, is filled in with the format and, for HTML, the token reduction.
+    """
+    stats = {} if stats is None else stats
+    url = resolve_url(url)
+    with tempfile.NamedTemporaryFile(prefix='paper-') as tmp:
+        resp = _download(url, tmp)
+        content_type = resp.headers.get('Content-Type', '')
+        if url.lower().endswith('.pdf') or 'pdf' in content_type or tmp.read(5) == b'%PDF-':
+            with trace('pdf_parse') as span, closing(iter_pdf_pages(tmp.name)) as pages:
+                text, span['pages'] = _take_text(pages)
+            metrics.observe('paper_pdf_pages', span['pages'])
+            stats.update(format='pdf', pages=span['pages'])
+            return text
+        # HTML page
+        tmp.seek(0)
+        encoding = resp.encoding if 'charset' in content_type else None
+        with trace('html_parse'):
+            soup = BeautifulSoup(tmp, HTML_PARSER, from_encoding=encoding)
+
+    with trace('html_extract'):
+        raw_tokens = estimate_tokens(soup.get_text())
+        pdf_link = soup.find('meta', attrs={'name': 'citation_pdf_url'})
+        text = extract_html(soup, urlsplit(resp.url).hostname)
+    if follow_pdf and pdf_link and pdf_link.get('content') and len(text) < HTML_MIN_CHARS:
+        # An abstract-only landing page; the linked PDF has the paper itself
+        return fetch_text(urljoin(resp.url, pdf_link['content']), stats, follow_pdf=False)
+    text = text[:EXTRACT_MAX_CHARS]
+    tokens = estimate_tokens(text)
+    stats.update(
+        format='html',
+        raw_tokens=raw_tokens,
+        tokens=tokens,
+        reduction=round(1 - tokens / raw_tokens, 3) if raw_tokens else 0.0,
+    )
+    return text
+
+
+SUMMARY_PROMPT = """
 Summarize this academic paper into a Markdown snippet with sections:
 
 # Motivation
@@ -49,18 +702,1062 @@ Summarize this academic paper into a Markdown snippet with sections:
 # Limitations
 ...
 
-Paper content:
+{label}:
 ```
-{text}
+{content}
 ```
 """
-    response = openai.chat.completions.create(
-        model=MODEL,
-        messages=[{'role': 'user', 'content': prompt}],
+
+MAP_PROMPT = """
+This is part {index} of {total} of an academic paper. Take concise notes on anything
+it says about the paper's motivation, key contributions, methods, results and
+limitations. Skip topics this part does not cover.
+
+Paper excerpt:
+```
+{content}
+```
+"""
+
+# Numbered ("3.1 Training"), well-known or ALL-CAPS section headings on their own line.
+# Well-known names may only be followed by title-case words ("Results and Analysis"), not
+# by a sentence that happens to wrap there ("References to earlier work are listed in").
+_HEADING_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'(?:\d+(?:\.\d+)*\.?|[IVX]+\.)[ \t]+[A-Z][^\n]{0,80}'
+    r'|(?:Abstract|Introduction|Related [Ww]ork|Background|Methods?|Experiments?|Results'
+    r'|Discussion|Conclusions?|References|Bibliography|Appendix|Acknowledge?ments)'
+    r'(?:[ \t]+(?:and|&|of|for|the|[A-Z][\w-]*)){0,4}'
+    r'|[A-Z][A-Z \t]{3,40}'
+    r')(?<![.,;:])[ \t]*$',
+    re.MULTILINE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def split_sections(text: str) -> list:
+    """Split text at detected headings into (heading, body) pairs; the preamble has no heading."""
+    sections, heading, start = [], '', 0
+    for match in _HEADING_RE.finditer(text):
+        sections.append((heading, text[start:match.start()]))
+        # The body starts after the heading's line break, which callers put back
+        heading, start = match.group().strip(), min(match.end() + 1, len(text))
+    sections.append((heading, text[start:]))
+    return [(h, b) for h, b in sections if h or b.strip()]
+
+
+def _split_oversized(piece: str, max_tokens: int, seps: tuple = ('\n\n', '\n')) -> list:
+    """Split a piece at paragraph, then line, then character boundaries to fit max_tokens."""
+    if estimate_tokens(piece) <= max_tokens:
+        return [piece]
+    if not seps:
+        step = max_tokens * CHARS_PER_TOKEN
+        return [piece[i:i + step] for i in range(0, len(piece), step)]
+    parts, pieces = [], piece.split(seps[0])
+    for i, part in enumerate(pieces):
+        if i < len(pieces) - 1:
+            part += seps[0]
+        parts.extend(p for p in _split_oversized(part, max_tokens, seps[1:]) if p)
+    return parts
+
+
+def _pack(pieces: list, max_tokens: int) -> list:
+    """Greedily concatenate pieces into chunks of at most max_tokens."""
+    chunks, current, used = [], [], 0
+    for piece in pieces:
+        for part in _split_oversized(piece, max_tokens):
+            tokens = estimate_tokens(part)
+            if current and used + tokens > max_tokens:
+                chunks.append(''.join(current))
+                current, used = [], 0
+            current.append(part)
+            used += tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> list:
+    """Token-budgeted chunks of text, breaking at section headings where possible."""
+    sections = [f'{heading}\n{body}' if heading else body for heading, body in split_sections(text)]
+    return [c for c in _pack(sections, max_tokens) if c.strip()]
+
+
+class RateLimiter:
+    """Token bucket refilled continuously at per_minute; acquire blocks until there is room."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self._available = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: int = 1):
+        if not self.rate:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available = min(
+                    self.capacity, self._available + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._available >= amount:
+                    self._available -= amount
+                    return
+                wait = (amount - self._available) / self.rate
+            time.sleep(wait)
+
+
+token_limiter = RateLimiter(LLM_TOKENS_PER_MINUTE)
+request_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE)
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for model, or None if tiktoken or its BPE files are unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception as exc:
+        # Encodings are downloaded on first use, which fails without network access
+        app.logger.warning('Falling back to estimated token counts: %r', exc)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for MODEL; estimated from its length when tiktoken is unavailable."""
+    encoding = _encoding(MODEL)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# Lines within this many of a page's top or bottom may be running headers, footers or numbers
+_PAGE_EDGE_LINES = 3
+_PAGE_NUMBER_RE = re.compile(r'^(?:page\s*)?\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?$', re.IGNORECASE)
+# Headings that are a whole line on their own: "References", "7 Bibliography", "Appendix B"
+_BACK_MATTER_RE = re.compile(
+    r'(?:(?:\d+|[IVX]+)\.?[ \t]+)?(?:references|bibliography)', re.IGNORECASE,
+)
+_DROPPED_SECTION_RE = re.compile(
+    r'(?:(?:\d+|[IVX]+)\.?[ \t]+)?(?:appendix(?:[ \t]+[A-Z])?|appendices|acknowledge?ments?)',
+    re.IGNORECASE,
+)
+_SECTION_PRIORITIES = (
+    # Trimmed first (lowest) to last when the text is over budget
+    (0, re.compile(r'related work|background|preliminar|prior work|notation', re.IGNORECASE)),
+    (2, re.compile(r'abstract|introduction|conclusion|discussion|limitation|summary', re.IGNORECASE)),
+)
+
+
+def _strip_page_furniture(pages: list) -> list:
+    """Remove page numbers and lines repeated at the edges of many pages (running heads)."""
+    def edges(lines):
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        return set(filled[:_PAGE_EDGE_LINES] + filled[-_PAGE_EDGE_LINES:])
+
+    def key(line):
+        return re.sub(r'\d+', '#', line.strip().lower())
+
+    pages = [page.split('\n') for page in pages]
+    seen = {}
+    for lines in pages:
+        for k in {key(lines[i]) for i in edges(lines)}:
+            seen[k] = seen.get(k, 0) + 1
+    threshold = max(3, len(pages) // 2)
+    running = {k for k, count in seen.items() if count >= threshold and k}
+    cleaned = []
+    for lines in pages:
+        edge = edges(lines)
+        cleaned.append('\n'.join(
+            line for i, line in enumerate(lines)
+            if i not in edge or (key(line) not in running and not _PAGE_NUMBER_RE.match(line.strip()))
+        ))
+    return cleaned
+
+
+def clean_text(text: str) -> str:
+    """Strip extraction noise and back matter: running heads, page numbers, hyphenation,
+    references, appendices and redundant whitespace."""
+    pages = text.split('\f')
+    if len(pages) > 1:
+        # Page breaks become blank lines: both set a heading apart from the text before it
+        text = '\n\n'.join(_strip_page_furniture(pages))
+    text = re.sub(r'([a-z])-\n([a-z])', r'\1\2', text)
+    text = re.sub(r'[ \t\xa0]+', ' ', text)
+    text = re.sub(r' ?\n ?', '\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text).strip()
+
+    # Only a standalone line counts as a heading here, so wrapped body lines such as
+    # "References to earlier work are listed in" never cut the paper short
+    lines = text.split('\n')
+    kept, dropping, position = [], False, 0
+    for i, line in enumerate(lines):
+        if i == 0 or not lines[i - 1]:
+            # A references heading in the first third is more likely a table of contents entry
+            if _BACK_MATTER_RE.fullmatch(line) and position > len(text) / 3:
+                break
+            if _DROPPED_SECTION_RE.fullmatch(line):
+                dropping = True
+            elif dropping and _HEADING_RE.match(line):
+                dropping = False
+        position += len(line) + 1
+        if not dropping:
+            kept.append(line)
+    return '\n'.join(kept).strip()
+
+
+def _section_priority(heading: str) -> int:
+    if not heading:
+        return 2  # title, authors and usually the abstract
+    for priority, pattern in _SECTION_PRIORITIES:
+        if pattern.search(heading):
+            return priority
+    return 1
+
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """Trim text to budget tokens, cutting low-priority and later sections first."""
+    total = count_tokens(text)
+    if total <= budget:
+        return text
+    sections = [[heading, body, count_tokens(body)] for heading, body in split_sections(text)]
+    order = sorted(range(len(sections)), key=lambda i: (_section_priority(sections[i][0]), -i))
+    for i in order:
+        if total <= budget:
+            break
+        body, tokens = sections[i][1], sections[i][2]
+        keep = max(0, tokens - (total - budget))
+        # Truncate proportionally in characters; headings are kept as context
+        if tokens:
+            sections[i][1] = body[:len(body) * keep // tokens].rstrip() + '\n'
+        total -= tokens - keep
+    return ''.join(f'{h}\n{b}' if h else b for h, b, _ in sections)
+
+
+def _record_usage(span: dict, usage) -> dict:
+    """Note a chat call's token usage on its span and in the token metrics."""
+    if usage is None:
+        return None
+    usage = {
+        'prompt_tokens': usage.prompt_tokens,
+        'completion_tokens': usage.completion_tokens,
+        'total_tokens': usage.total_tokens,
+    }
+    span.update(usage)
+    for kind in ('prompt', 'completion'):
+        metrics.observe('paper_llm_tokens', usage[f'{kind}_tokens'], kind=kind)
+        metrics.inc('paper_llm_tokens_total', usage[f'{kind}_tokens'], kind=kind)
+    return usage
+
+
+def _wait_for_rate_limit(prompt: str):
+    with trace('rate_limit_wait'):
+        request_limiter.acquire()
+        token_limiter.acquire(estimate_tokens(prompt) + COMPLETION_TOKEN_ESTIMATE)
+
+
+def _chat(prompt: str) -> str:
+    _wait_for_rate_limit(prompt)
+    with trace('llm') as span:
+        response = openai.chat.completions.create(
+            model=MODEL,
+            messages=[{'role': 'user', 'content': prompt}],
+        )
+        _record_usage(span, response.usage)
+    return response.choices[0].message.content
+
+
+def _chat_stream(prompt: str):
+    """Yield content deltas of a streamed chat completion; returns its token usage."""
+    _wait_for_rate_limit(prompt)
+    with trace('llm') as span:
+        stream = openai.chat.completions.create(
+            model=MODEL,
+            messages=[{'role': 'user', 'content': prompt}],
+            stream=True,
+            stream_options={'include_usage': True},
+        )
+        usage = None
+        for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        return _record_usage(span, usage)
+
+
+def resolve_mode(mode: str, tokens: int) -> str:
+    if mode == 'auto':
+        return 'mapreduce' if tokens > MAPREDUCE_THRESHOLD_TOKENS else 'single'
+    return mode
+
+
+def _summary_prompt(text: str, mode: str, timings: dict) -> str:
+    """The prompt for the final summary call; map-reduce mode runs the map stage to build it."""
+    if mode == 'single':
+        return SUMMARY_PROMPT.format(label='Paper content', content=text)
+
+    with trace('map', timings):
+        chunks = chunk_text(text)
+        prompts = [
+            MAP_PROMPT.format(index=i, total=len(chunks), content=chunk)
+            for i, chunk in enumerate(chunks, 1)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, min(MAP_CONCURRENCY, len(prompts)))) as pool:
+            notes = list(pool.map(_in_context(_chat), prompts))
+    return SUMMARY_PROMPT.format(
+        label='Notes taken from consecutive parts of the paper',
+        content='\n\n'.join(notes),
     )
-    md = response.choices[0].message.content
 
-    return jsonify({'status': 'ok', 'markdown': md})
+
+def summarize(text: str, mode: str = 'single') -> dict:
+    """Five-section Markdown summary of a paper, in one call or by map-reduce over chunks."""
+    timings = {}
+    prompt = _summary_prompt(text, mode, timings)
+    with trace('summarize' if mode == 'single' else 'reduce', timings):
+        md = _chat(prompt)
+    return {'markdown': md, 'mode': mode, 'timings': timings}
+
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was '
+    'were we which with our can not these their they than also be been using used'.split()
+)
+
+
+def embed(text: str, dim: int = INDEX_DIM) -> np.ndarray:
+    """Unit-length hashed bag of word unigrams and bigrams, with sublinear term frequency."""
+    words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+    terms = Counter(words)
+    terms.update(f'{a} {b}' for a, b in zip(words, words[1:]))
+    vector = np.zeros(dim, dtype=np.float32)
+    for term, count in terms.items():
+        h = zlib.crc32(term.encode())
+        # The top hash bit picks a sign so that collisions tend to cancel out
+        vector[h % dim] += (1 + math.log(count)) * (1 if h & 0x80000000 else -1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SummaryIndex:
+    """Summaries, their text and metadata in SQLite, with a memory-mapped embedding matrix.
+
+    Row i of vectors.f32 is the embedding of the summary whose ``row`` is i. Rows are
+    numbered densely inside a write transaction, so processes sharing the index never
+    write the same slot, and readers map only committed rows: bytes past them belong to
+    an append in progress (or one that crashed) and are overwritten by the next append.
+    """
+
+    def __init__(self, path: str = INDEX_DIR, dim: int = INDEX_DIM):
+        os.makedirs(path, exist_ok=True)
+        self.dim = dim
+        self._vectors_path = os.path.join(path, 'vectors.f32')
+        self._vectors = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(path, 'papers.sqlite3'), check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # One row per summary: a paper has one for each model, prompt version and mode
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS papers ('
+            'row INTEGER PRIMARY KEY, digest TEXT NOT NULL, url TEXT NOT NULL, '
+            'title TEXT NOT NULL, model TEXT NOT NULL, prompt_version TEXT NOT NULL, '
+            'mode TEXT NOT NULL, markdown TEXT NOT NULL, text TEXT NOT NULL, '
+            'created REAL NOT NULL, UNIQUE (digest, model, prompt_version, mode))'
+        )
+        open(self._vectors_path, 'ab').close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM papers').fetchone()[0]
+
+    def add(self, url: str, digest: str, text: str, markdown: str, mode: str,
+            vector: np.ndarray = None):
+        """Store a summary made by MODEL with PROMPT_VERSION in mode, unless one is stored."""
+        vector = embed(text, self.dim) if vector is None else vector
+        title = next((line.strip() for line in text.splitlines() if line.strip()), url)[:200]
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other process can pick the same row
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT COALESCE(MAX(row) + 1, 0) FROM papers'
+                ).fetchone()[0]
+                cursor = self._conn.execute(
+                    'INSERT INTO papers (row, digest, url, title, model, prompt_version, mode, '
+                    'markdown, text, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (digest, model, prompt_version, mode) DO NOTHING',
+                    (row, digest, url, title, MODEL, PROMPT_VERSION, mode, markdown, text,
+                     time.time()),
+                )
+                if cursor.rowcount:
+                    with open(self._vectors_path, 'r+b') as f:
+                        f.seek(row * self.dim * 4)
+                        f.write(vector.astype(np.float32).tobytes())
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _matrix(self):
+        """Read-only map of the committed vectors, remapped when any process adds rows."""
+        rows = len(self)
+        with self._lock:
+            if rows and (self._vectors is None or len(self._vectors) != rows):
+                self._vectors = np.memmap(
+                    self._vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim),
+                )
+            return self._vectors
+
+    def _rows(self, rows, columns: str, where: str = '', params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(
+                f'SELECT row, {columns} FROM papers WHERE row IN (%s) {where}'
+                % ','.join('?' * len(rows)),
+                [int(i) for i in rows] + list(params),
+            ).fetchall()
+
+    def search(self, query: str = None, k: int = 10, vector: np.ndarray = None) -> list:
+        """Top-k papers by cosine similarity to the query text (or a given embedding)."""
+        vector = embed(query, self.dim) if vector is None else vector
+        vectors = self._matrix()
+        if vectors is None or not k:
+            return []
+        scores = vectors @ vector
+        # A paper has a row per summary; look a little deeper so k distinct papers remain
+        top = min(4 * k, len(scores))
+        top = np.argpartition(-scores, top - 1)[:top]
+        rows = sorted(
+            self._rows(top, 'digest, url, title, markdown, mode, created'),
+            key=lambda row: (-scores[row[0]], -row[6]),
+        )
+        results, seen = [], set()
+        for row, digest, url, title, markdown, mode, created in rows:
+            if digest not in seen and len(results) < k:
+                seen.add(digest)
+                results.append({
+                    'url': url, 'title': title, 'markdown': markdown, 'mode': mode,
+                    'created': created, 'score': round(float(scores[row]), 4),
+                })
+        return results
+
+    def find_duplicate(self, vector: np.ndarray, mode: str,
+                       threshold: float = DUPLICATE_THRESHOLD):
+        """The closest summary at or above threshold that MODEL, PROMPT_VERSION and mode
+        would produce today, or None."""
+        vectors = self._matrix()
+        if vectors is None:
+            return None
+        scores = vectors @ vector
+        close = np.flatnonzero(scores >= threshold)
+        close = close[np.argsort(-scores[close])][:100]
+        if not len(close):
+            return None
+        rows = self._rows(
+            close, 'url, markdown, mode', 'AND model = ? AND prompt_version = ? AND mode = ?',
+            (MODEL, PROMPT_VERSION, mode),
+        )
+        if not rows:
+            return None
+        row, url, markdown, mode = max(rows, key=lambda row: scores[row[0]])
+        return {'url': url, 'markdown': markdown, 'mode': mode,
+                'score': round(float(scores[row]), 4)}
+
+
+index = SummaryIndex() if INDEX_DIR else None
+
+
+def _summary_key(digest: str, mode: str) -> str:
+    return f'summary:{digest}:{MODEL}:{PROMPT_VERSION}:{mode}'
+
+
+def _lookup(url: str, mode: str) -> dict:
+    """Resolve a paper through the URL -> content hash -> summary cache, fetching on a miss.
+
+    The returned dict has 'markdown' set when a cached summary exists, and 'text' when
+    the paper had to be downloaded.
+    """
+    paper = {'url': url, 'url_key': 'url:' + normalize_url(url), 'markdown': None, 'timings': {}}
+    # URL entries hold "<content hash>:<token count>" so auto mode resolves without a fetch
+    entry = cache.get(paper['url_key']) if cache else None
+    if entry:
+        digest, tokens = entry.split(':')
+        paper['mode'] = resolve_mode(mode, int(tokens))
+        paper['markdown'] = cache.get(_summary_key(digest, paper['mode']))
+        if paper['markdown'] is not None:
+            return paper
+
+    paper['extraction'] = {}
+    with trace('fetch', paper['timings']):
+        text = fetch_text(url, paper['extraction'])
+    paper['digest'] = hashlib.sha256(text.encode()).hexdigest()
+    with trace('compress', paper['timings']):
+        original = count_tokens(text)
+        text = clean_text(text)
+        paper['tokens'] = count_tokens(text)
+        paper['mode'] = resolve_mode(mode, paper['tokens'])
+        budget = PROMPT_TOKEN_BUDGET if paper['mode'] == 'single' else MAPREDUCE_TOKEN_BUDGET
+        paper['text'] = fit_to_budget(text, budget)
+        final = paper['tokens'] if paper['text'] is text else count_tokens(paper['text'])
+    paper['token_counts'] = {'original': original, 'final': final}
+    paper['cleaned'] = text
+    paper['markdown'] = cache.get(_summary_key(paper['digest'], paper['mode'])) if cache else None
+    if paper['markdown'] is None and index is not None:
+        # The same paper fetched from another URL or version need not be summarized again,
+        # as long as its summary is what this model, prompt and mode would write now
+        with trace('index_lookup'):
+            paper['vector'] = embed(text)
+            match = index.find_duplicate(paper['vector'], paper['mode'])
+        if match:
+            paper['markdown'] = match['markdown']
+            paper['mode'] = match['mode']
+            paper['duplicate_of'] = match['url']
+    return paper
+
+
+def _remember(paper: dict, md: str, new: bool):
+    """Cache and index a summary (if new) and cache the URL's content hash (if fetched)."""
+    if 'text' not in paper:
+        return
+    if new and index is not None:
+        with trace('index_add'):
+            index.add(paper['url'], paper['digest'], paper['cleaned'], md, paper['mode'],
+                      paper.get('vector'))
+    if not cache:
+        return
+    if new or 'duplicate_of' in paper:
+        cache.set(_summary_key(paper['digest'], paper['mode']), md)
+    cache.set(paper['url_key'], f"{paper['digest']}:{paper['tokens']}", ttl=CACHE_URL_TTL)
+
+
+def ingest_url(url: str, mode: str = SUMMARY_MODE, kind: str = 'json') -> dict:
+    """Summarize a paper, going through the URL -> content hash -> summary cache."""
+    started = time.perf_counter()
+    with traced_ingest(kind, url=url) as record:
+        paper = _lookup(url, mode)
+        result = {'markdown': paper['markdown'], 'cache': 'hit', 'mode': paper['mode']}
+        if paper['markdown'] is None:
+            result = summarize(paper['text'], paper['mode'])
+            paper['timings'].update(result.pop('timings'))
+            result['cache'] = 'miss'
+        _remember(paper, result['markdown'], new=result['cache'] == 'miss')
+        record.update(mode=result['mode'], cache=result['cache'])
+    paper['timings']['total'] = round(time.perf_counter() - started, 3)
+    result['timings'] = paper['timings']
+    result['extraction'] = paper.get('extraction')
+    result['tokens'] = paper.get('token_counts')
+    if 'duplicate_of' in paper:
+        result['duplicate_of'] = paper['duplicate_of']
+    return result
+
+
+def ingest_events(url: str, mode: str = SUMMARY_MODE):
+    """Summarize a paper as a stream of (event, data) pairs, forwarding model output as it arrives.
+
+    Events are 'status' (stage changes), 'delta' (Markdown text), 'section' (a heading
+    completed) and finally 'done' with the mode, cache outcome, usage and timings.
+    """
+    started = time.perf_counter()
+    with traced_ingest('stream', url=url) as record:
+        yield 'status', {'stage': 'fetch'}
+        paper = _lookup(url, mode)
+        timings = paper['timings']
+        record['mode'] = paper['mode']
+        if paper['markdown'] is not None:
+            record['cache'] = 'hit'
+            _remember(paper, paper['markdown'], new=False)
+            yield 'delta', {'content': paper['markdown']}
+            timings['total'] = round(time.perf_counter() - started, 3)
+            yield 'done', {
+                'mode': paper['mode'],
+                'cache': 'hit',
+                'usage': None,
+                'timings': timings,
+                'duplicate_of': paper.get('duplicate_of'),
+            }
+            return
+
+        record['cache'] = 'miss'
+        if paper['mode'] == 'mapreduce':
+            yield 'status', {'stage': 'map', 'mode': paper['mode']}
+        prompt = _summary_prompt(paper['text'], paper['mode'], timings)
+        stage = 'summarize' if paper['mode'] == 'single' else 'reduce'
+        yield 'status', {'stage': stage, 'mode': paper['mode']}
+
+        stream = _chat_stream(prompt)
+        parts, line = [], ''
+        with trace(stage, timings):
+            while True:
+                try:
+                    delta = next(stream)
+                except StopIteration as stop:
+                    usage = stop.value
+                    break
+                if not parts:
+                    timings['first_token'] = round(time.perf_counter() - started, 3)
+                parts.append(delta)
+                yield 'delta', {'content': delta}
+                *lines, line = (line + delta).split('\n')
+                for complete in lines:
+                    if complete.startswith('# '):
+                        yield 'section', {'title': complete[2:].strip()}
+
+        _remember(paper, ''.join(parts), new=True)
+        timings['total'] = round(time.perf_counter() - started, 3)
+        yield 'done', {
+            'mode': paper['mode'],
+            'cache': 'miss',
+            'usage': usage,
+            'timings': timings,
+            'extraction': paper['extraction'],
+            'tokens': paper['token_counts'],
+        }
+
+
+def _sse(event: str, data: dict) -> str:
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _job_key(url: str, mode: str) -> str:
+    return f'{normalize_url(url)}|{mode}'
+
+
+def _new_job(url: str, mode: str) -> dict:
+    now = time.time()
+    return {
+        'id': uuid.uuid4().hex, 'url': url, 'mode': mode, 'status': 'queued',
+        'attempts': 0, 'result': None, 'error': None, 'created': now, 'updated': now,
+    }
+
+
+class MemoryJobQueue:
+    """In-process job queue; jobs are lost when the process exits."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._active = {}  # dedup key -> id of a queued or running job
+        self._ready = []  # heap of (available_at, seq, job id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def submit(self, url: str, mode: str) -> dict:
+        """Enqueue a job, or return the in-flight job for the same URL and mode."""
+        key = _job_key(url, mode)
+        with self._cond:
+            if key in self._active:
+                return dict(self._jobs[self._active[key]])
+            self._prune()
+            job = _new_job(url, mode)
+            self._jobs[job['id']] = job
+            self._active[key] = job['id']
+            heapq.heappush(self._ready, (job['created'], next(self._seq), job['id']))
+            self._cond.notify()
+            return dict(job)
+
+    def claim(self, timeout: float = 1.0):
+        """Mark the next available job running and return it, or None after timeout."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._ready and self._ready[0][0] <= now:
+                    job = self._jobs[heapq.heappop(self._ready)[2]]
+                    job.update(status='running', attempts=job['attempts'] + 1, updated=now)
+                    return dict(job)
+                if now >= deadline:
+                    return None
+                wait = deadline - now
+                if self._ready:
+                    wait = min(wait, self._ready[0][0] - now)
+                self._cond.wait(wait)
+
+    def complete(self, job_id: str, result: dict):
+        with self._cond:
+            self._finish(self._jobs[job_id], status='done', result=result, error=None)
+
+    def fail(self, job_id: str, error: str, retry_at: float = None):
+        """Record a failure; the job is queued again at retry_at if given."""
+        with self._cond:
+            job = self._jobs[job_id]
+            if retry_at is None:
+                self._finish(job, status='failed', error=error)
+                return
+            job.update(status='queued', error=error, updated=time.time())
+            heapq.heappush(self._ready, (retry_at, next(self._seq), job_id))
+            self._cond.notify()
+
+    def renew(self, job_id: str):
+        """Jobs cannot outlive this process, so there is no lease to extend."""
+
+    def get(self, job_id: str):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _finish(self, job: dict, **fields):
+        job.update(updated=time.time(), **fields)
+        self._active.pop(_job_key(job['url'], job['mode']), None)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RESULT_TTL
+        for job_id in [j['id'] for j in self._jobs.values()
+                       if j['status'] in ('done', 'failed') and j['updated'] < cutoff]:
+            del self._jobs[job_id]
+
+
+class SQLiteJobQueue:
+    """Durable job queue shared by processes; running jobs hold a lease their worker renews.
+
+    A job whose lease lapses (its worker died) is claimed again.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, lease: float = JOB_LEASE_SECONDS):
+        self.lease = lease
+        self._cond = threading.Condition()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, dedup_key TEXT NOT NULL, url TEXT NOT NULL, '
+            'mode TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, '
+            'result TEXT, error TEXT, available_at REAL NOT NULL, '
+            'created REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, updated)')
+
+    def submit(self, url: str, mode: str) -> dict:
+        """Enqueue a job, or return the in-flight job for the same URL and mode."""
+        key = _job_key(url, mode)
+        with self._cond:
+            # IMMEDIATE takes the write lock before the check, so two processes cannot both insert
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')",
+                    (key,),
+                ).fetchone()
+                if row:
+                    job = self._get(row[0])
+                else:
+                    self._conn.execute(
+                        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                        (time.time() - JOB_RESULT_TTL,),
+                    )
+                    job = _new_job(url, mode)
+                    self._conn.execute(
+                        'INSERT INTO jobs (id, dedup_key, url, mode, status, attempts, '
+                        'available_at, created, updated) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)',
+                        (job['id'], key, url, mode, job['status'], job['created'],
+                         job['created'], job['updated']),
+                    )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            if not row:
+                self._cond.notify()
+            return job
+
+    def claim(self, timeout: float = 1.0):
+        """Mark the next queued or abandoned job running and return it, or None after timeout."""
+        deadline = time.time() + timeout
+        available = (
+            "((status = 'queued' AND available_at <= ?) OR (status = 'running' AND updated < ?))"
+        )
+        with self._cond:
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    f'SELECT id FROM jobs WHERE {available} ORDER BY available_at LIMIT 1',
+                    (now, now - self.lease),
+                ).fetchone()
+                # Repeating the condition keeps claims exclusive across processes sharing the file
+                if row and self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated = ? "
+                    f'WHERE id = ? AND {available}',
+                    (now, row[0], now, now - self.lease),
+                ).rowcount:
+                    return self._get(row[0])
+                if now >= deadline:
+                    return None
+                self._cond.wait(min(0.5, deadline - now))
+
+    def complete(self, job_id: str, result: dict):
+        with self._cond:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated = ? "
+                'WHERE id = ?',
+                (json.dumps(result), time.time(), job_id),
+            )
+
+    def renew(self, job_id: str):
+        """Extend the lease of a running job."""
+        with self._cond:
+            self._conn.execute(
+                "UPDATE jobs SET updated = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, retry_at: float = None):
+        """Record a failure; the job is queued again at retry_at if given."""
+        with self._cond:
+            status = 'failed' if retry_at is None else 'queued'
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, available_at = ?, updated = ? '
+                'WHERE id = ?',
+                (status, error, retry_at or 0, time.time(), job_id),
+            )
+            self._cond.notify()
+
+    def get(self, job_id: str):
+        with self._cond:
+            return self._get(job_id)
+
+    def _get(self, job_id: str):
+        row = self._conn.execute(
+            'SELECT id, url, mode, status, attempts, result, error, created, updated '
+            'FROM jobs WHERE id = ?',
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(
+            ('id', 'url', 'mode', 'status', 'attempts', 'result', 'error', 'created', 'updated'),
+            row,
+        ))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+
+def make_job_queue(backend: str = JOB_QUEUE):
+    if backend == 'memory':
+        return MemoryJobQueue()
+    if backend == 'sqlite':
+        return SQLiteJobQueue()
+    raise ValueError(f'Unknown JOB_QUEUE: {backend}')
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Whether a failure is worth retrying (network errors, 429s and 5xx responses)."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout,
+                        openai.APIConnectionError, openai.RateLimitError,
+                        openai.InternalServerError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+class WorkerPool:
+    """Threads that run queued ingest jobs, retrying transient failures with backoff."""
+
+    def __init__(self, queue, workers: int = JOB_WORKERS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, backoff: float = JOB_RETRY_BACKOFF,
+                 heartbeat: float = JOB_LEASE_SECONDS / 3):
+        self.queue = queue
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.heartbeat = heartbeat
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'ingest-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            # A queue error (e.g. a locked database) must not end the thread; nothing restarts it.
+            # A job it leaves running is reclaimed once its lease lapses.
+            try:
+                self._step()
+            except Exception as exc:
+                app.logger.warning('Ingest worker error: %r', exc)
+                time.sleep(self.backoff)
+
+    def _step(self):
+        """Claim and run one job, if any is ready."""
+        job = self.queue.claim()
+        if job is None:
+            return
+        if job['attempts'] == 1:
+            metrics.observe('paper_job_wait_seconds', job['updated'] - job['created'])
+        if job['attempts'] > self.max_attempts:
+            # Reclaimed after its lease lapsed too often, e.g. a paper that kills the process
+            metrics.inc('paper_jobs_total', outcome='failed')
+            self.queue.fail(job['id'], 'Lease expired; the worker running the job died')
+            return
+        done = threading.Event()
+        threading.Thread(
+            target=self._renew, args=(job['id'], done), name=f"lease-{job['id']}", daemon=True,
+        ).start()
+        try:
+            result = ingest_url(job['url'], job['mode'], kind='job')
+        except Exception as exc:
+            retry_at = None
+            if _is_transient(exc) and job['attempts'] < self.max_attempts:
+                delay = self.backoff * 2 ** (job['attempts'] - 1)
+                retry_at = time.time() + delay + random.uniform(0, self.backoff)
+            app.logger.warning('Job %s attempt %d failed: %r', job['id'], job['attempts'], exc)
+            metrics.inc('paper_jobs_total', outcome='failed' if retry_at is None else 'retried')
+            self.queue.fail(job['id'], f'{type(exc).__name__}: {exc}', retry_at)
+        else:
+            metrics.inc('paper_jobs_total', outcome='done')
+            self.queue.complete(job['id'], result)
+        finally:
+            done.set()
+
+    def _renew(self, job_id: str, done: threading.Event):
+        """Keep renewing a job's lease while it runs, so no other process claims it."""
+        while not done.wait(self.heartbeat):
+            try:
+                self.queue.renew(job_id)
+            except Exception as exc:
+                app.logger.warning('Could not renew the lease of job %s: %r', job_id, exc)
+
+
+job_queue = make_job_queue()
+worker_pool = WorkerPool(job_queue)
+# Shared by all batch requests so BATCH_CONCURRENCY is a global cap
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch')
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    data = request.get_json() or {}
+    url = data.get('url')
+    if not url:
+        return jsonify({'error': 'Missing url'}), 400
+    mode = data.get('mode', SUMMARY_MODE)
+    if mode not in SUMMARY_MODES:
+        return jsonify({'error': f"mode must be one of {', '.join(SUMMARY_MODES)}"}), 400
+
+    if request.args.get('async') in ('1', 'true'):
+        submitted = time.time()
+        job = job_queue.submit(url, mode)
+        # An older job means an identical one was already in flight
+        metrics.inc('paper_jobs_total',
+                    outcome='deduplicated' if job['created'] < submitted else 'queued')
+        worker_pool.start()
+        resp = jsonify({'status': job['status'], 'job_id': job['id']})
+        resp.headers['Location'] = f"/api/jobs/{job['id']}"
+        return resp, 202
+
+    if data.get('stream') or request.args.get('stream') in ('1', 'true'):
+        def events():
+            try:
+                for event, payload in ingest_events(url, mode):
+                    yield _sse(event, payload)
+            except Exception as exc:
+                app.logger.exception('Streaming ingest of %s failed', url)
+                yield _sse('error', {'error': f'{type(exc).__name__}: {exc}'})
+
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    # Fetch and summarize
+    result = ingest_url(url, mode)
+    resp = jsonify({
+        'status': 'ok',
+        'markdown': result['markdown'],
+        'mode': result['mode'],
+        'timings': result['timings'],
+        'extraction': result.get('extraction'),
+        'tokens': result.get('tokens'),
+        'duplicate_of': result.get('duplicate_of'),
+    })
+    resp.headers['X-Cache'] = result['cache']
+    return resp
+
+
+@app.route('/api/ingest/batch', methods=['POST'])
+def ingest_batch():
+    data = request.get_json() or {}
+    urls = data.get('urls')
+    if not urls or not isinstance(urls, list):
+        return jsonify({'error': 'Missing urls'}), 400
+    if not all(isinstance(url, str) and url.strip() for url in urls):
+        return jsonify({'error': 'urls must be non-empty strings'}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'error': f'At most {BATCH_MAX_URLS} urls per batch'}), 400
+    mode = data.get('mode', SUMMARY_MODE)
+    if mode not in SUMMARY_MODES:
+        return jsonify({'error': f"mode must be one of {', '.join(SUMMARY_MODES)}"}), 400
+
+    futures = {batch_pool.submit(ingest_url, url, mode, 'batch'): url for url in dict.fromkeys(urls)}
+
+    def results():
+        # One NDJSON line per paper, in completion order
+        try:
+            for future in as_completed(futures):
+                try:
+                    line = {'url': futures[future], 'status': 'ok', **future.result()}
+                except Exception as exc:
+                    line = {'url': futures[future], 'status': 'error',
+                            'error': f'{type(exc).__name__}: {exc}'}
+                yield json.dumps(line) + '\n'
+        finally:
+            # The client disconnected: don't start papers nobody will read
+            for future in futures:
+                future.cancel()
+
+    return Response(results(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing q'}), 400
+    if index is None:
+        return jsonify({'error': 'Search index is disabled'}), 404
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    with trace('search'):
+        results = index.search(query, k)
+    return jsonify({'status': 'ok', 'results': results})
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    worker_pool.start()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify({
+        'job_id': job['id'],
+        'url': job['url'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'error': job['error'],
+        'result': job['result'],
+    })
 
 
 if __name__ == '__main__':
@@ -0,0 +1,18 @@
+"""PDF page extraction, run inline or in process pool workers.
+
+Pool workers import only this module, so keep it free of app imports and state.
+"""
+import fitz  # PyMuPDF
+
+
+def page_text(page) -> str:
+    """Text of a PDF page, with a blank line between blocks (paragraphs, headings)."""
+    return '\n\n'.join(
+        block[4].strip() for block in page.get_text('blocks') if block[6] == 0 and block[4].strip()
+    )
+
+
+def extract_pages(path: str, start: int, stop: int) -> list:
+    """Text of pages [start, stop) of the PDF at path."""
+    with fitz.open(path) as doc:
+        return [page_text(doc[i]) for i in range(start, stop)]
@@ -0,0 +1,52 @@
+"""Shared setup for the benchmarks: import paths, app configuration and child processes."""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    """Make api/ingest.py and the test helpers importable, with throwaway local state."""
+    state = tempfile.mkdtemp(prefix='paper-summarizer-bench-')
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')
+    os.environ.setdefault('CACHE_BACKEND', 'none')
+    os.environ.setdefault('INDEX_DIR', '')
+    os.environ.setdefault('JOB_DB_PATH', os.path.join(state, 'jobs.sqlite3'))
+    for path in (ROOT, os.path.join(ROOT, 'api')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def peak_rss_mb(pid: int = None) -> float:
+    """Peak resident set size of this process, or of another process on Linux, in MiB."""
+    if pid is None:
+        per_mb = 1024 * 1024 if sys.platform == 'darwin' else 1024  # bytes on macOS, KiB on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / per_mb, 1)
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def run_child(script: str, *args) -> dict:
+    """Run script with --child and args in a fresh interpreter; returns the JSON it prints."""
+    out = subprocess.run(
+        [sys.executable, script, '--child', *map(str, args)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def print_table(rows: list, columns: list):
+    widths = [max(len(str(c)), *(len(str(row.get(c, ''))) for row in rows)) for c in columns]
+    print('  '.join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(c, '')).ljust(w) for c, w in zip(columns, widths)))
@@ -0,0 +1,112 @@
+"""PDF extraction: peak memory and wall time of the streaming, pooled extractor against
+the original ``requests.get`` + ``resp.content`` + join.
+
+    python bench/bench_extract.py [--pages 300] [--image-kb 200] [--workers N] [--repeat 3]
+
+Each measurement runs in a fresh interpreter, extracting the PDF twice: cold (including
+process pool start-up) and warm. Times are medians over the repeats.
+Pool workers' peak RSS is read from /proc and so is only reported on Linux.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from _common import peak_rss_mb, print_table, run_child, setup
+
+setup()
+
+
+def old_extract(url: str) -> str:
+    import fitz
+    import requests
+    resp = requests.get(url)
+    resp.raise_for_status()
+    doc = fitz.open(stream=resp.content, filetype='pdf')
+    return "\n".join(p.get_text() for p in doc)
+
+
+def new_extract(url: str) -> str:
+    import ingest
+    return ingest.fetch_text(url)
+
+
+def child(impl: str, url: str):
+    import ingest  # noqa: F401 -- same imports for both, so the baselines match
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    extract = old_extract if impl == 'old' else new_extract
+    text = extract(url)
+    seconds = time.perf_counter() - started
+    # A second run shows the steady state, once the pool's workers have started
+    started = time.perf_counter()
+    extract(url)
+    warm = time.perf_counter() - started
+    pool = ingest._pdf_pool
+    workers = [peak_rss_mb(pid) for pid in (pool._processes if pool else {})]
+    print(json.dumps({
+        'seconds': round(seconds, 3),
+        'warm_seconds': round(warm, 3),
+        'chars': len(text),
+        'baseline_mb': baseline,
+        'peak_mb': peak_rss_mb(),
+        'workers_mb': round(sum(workers), 1) if workers and None not in workers else None,
+    }))
+
+
+def make_fixture(path: str, pages: int, image_kb: int) -> str:
+    """A text PDF, with an incompressible image per page to stand in for figures."""
+    import fitz
+    from tests.helpers import make_pdf
+    make_pdf(path, pages)
+    if not image_kb:
+        return path
+    side = int((image_kb * 1024 / 3) ** 0.5)
+    with fitz.open(path) as doc:
+        for page in doc:
+            # A fresh image per page; identical streams would be stored once
+            pixmap = fitz.Pixmap(fitz.csRGB, side, side, os.urandom(side * side * 3), False)
+            page.insert_image(fitz.Rect(400, 700, 540, 790), stream=pixmap.tobytes('png'))
+        doc.save(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--image-kb', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='PDF_WORKERS for the new extractor')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    os.environ['PDF_WORKERS'] = str(args.workers)
+
+    from tests.helpers import serve_directory
+    with tempfile.TemporaryDirectory() as tmp, serve_directory(tmp) as base:
+        path = make_fixture(os.path.join(tmp, 'paper.pdf'), args.pages, args.image_kb)
+        print(f'fixture: {args.pages} pages, {os.path.getsize(path) / 2 ** 20:.1f} MiB, '
+              f'{args.workers} PDF workers')
+        rows = []
+        for impl in ('old', 'new'):
+            runs = [run_child(__file__, impl, f'{base}/paper.pdf') for _ in range(args.repeat)]
+            rows.append({
+                'impl': impl,
+                'cold_s': round(statistics.median(r['seconds'] for r in runs), 3),
+                'warm_s': round(statistics.median(r['warm_seconds'] for r in runs), 3),
+                'peak_mb': max(r['peak_mb'] for r in runs),
+                'over_baseline_mb': round(max(r['peak_mb'] - r['baseline_mb'] for r in runs), 1),
+                'workers_mb': runs[-1]['workers_mb'],
+                'chars': runs[-1]['chars'],
+            })
+    print_table(rows, ['impl', 'cold_s', 'warm_s', 'peak_mb', 'over_baseline_mb', 'workers_mb', 'chars'])
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        child(*sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,68 @@
+"""HTML extraction: parse time and output size of the main-content extractor against the
+original ``BeautifulSoup(html, 'html.parser').get_text()``.
+
+    python bench/bench_html.py [--pages 4 12 40] [--repeat 5]
+
+Output size is in characters and in estimated tokens, which is what the prompt pays for.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from _common import print_table, setup
+
+setup()
+
+import ingest  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+from tests.helpers import make_html  # noqa: E402
+
+
+def old_extract(path: str) -> str:
+    with open(path) as f:
+        return BeautifulSoup(f.read(), 'html.parser').get_text()
+
+
+def new_extract(path: str) -> str:
+    with open(path, 'rb') as f:
+        soup = BeautifulSoup(f, ingest.HTML_PARSER)
+    return ingest.extract_html(soup)
+
+
+def measure(extract, path: str, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = extract(path)
+        times.append(time.perf_counter() - started)
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 1),
+        'chars': len(text),
+        'tokens': ingest.estimate_tokens(text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[4, 12, 40])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'new parser: {ingest.HTML_PARSER}')
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = make_html(os.path.join(tmp, f'{pages}.html'), pages)
+            size = f'{os.path.getsize(path) // 1024} KiB'
+            old = measure(old_extract, path, args.repeat)
+            new = measure(new_extract, path, args.repeat)
+            rows += [dict(page=size, impl='old', **old), dict(page=size, impl='new', **new)]
+            rows[-1]['token_reduction'] = f"{1 - new['tokens'] / old['tokens']:.0%}"
+            rows[-1]['speedup'] = f"{old['median_ms'] / new['median_ms']:.2f}x"
+    print_table(rows, ['page', 'impl', 'median_ms', 'chars', 'tokens', 'token_reduction', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Prompt size: tokens and chat latency saved by cleaning and budgeting paper text, over a
+corpus of generated PDF and HTML papers, against the original extract-and-send-everything.
+
+    python bench/bench_prompt.py [--pages 8 20 60] [--budget TOKENS] [--seconds-per-1k 0.05] [--live]
+
+By default the chat calls go to a local stub whose latency is seconds-per-1k times the
+prompt tokens (a stand-in for prefill time), so latency savings there only restate token
+savings. Pass --live to call the configured OpenAI model instead (this costs tokens).
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+
+from _common import print_table, setup
+
+setup()
+
+import fitz  # noqa: E402
+import openai  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+import ingest  # noqa: E402
+from tests.helpers import make_html, make_pdf, stub_chat_server  # noqa: E402
+
+
+def corpus(directory: str, pages: list) -> list:
+    """(name, original extraction, current extraction) for each generated paper."""
+    papers = []
+    for seed, count in enumerate(pages):
+        path = make_pdf(os.path.join(directory, f'{count}.pdf'), count, seed=seed)
+        with fitz.open(path) as doc:
+            original = "\n".join(p.get_text() for p in doc)
+            name = f'pdf, {doc.page_count} pages'
+        current, _ = ingest._take_text(ingest.iter_pdf_pages(path))
+        papers.append((name, original, current))
+    for seed, count in enumerate(pages, len(pages)):
+        path = make_html(os.path.join(directory, f'{count}.html'), count, seed=seed)
+        with open(path) as f:
+            html = f.read()
+        original = BeautifulSoup(html, 'html.parser').get_text()
+        current = ingest.extract_html(BeautifulSoup(html, ingest.HTML_PARSER))
+        papers.append((f'html, {len(html) // 1024} KiB', original, current))
+    return papers
+
+
+def timed_chat(prompt: str) -> float:
+    started = time.perf_counter()
+    ingest._chat(prompt)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[8, 20, 60])
+    parser.add_argument('--budget', type=int, default=ingest.PROMPT_TOKEN_BUDGET,
+                        help='PROMPT_TOKEN_BUDGET for the cleaned text')
+    parser.add_argument('--seconds-per-1k', type=float, default=0.05)
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+
+    rows = []
+    stub = nullcontext() if args.live else stub_chat_server(args.seconds_per_1k)
+    with tempfile.TemporaryDirectory() as tmp, stub as server:
+        if server:
+            openai.base_url = server.base_url
+        timed_chat('Reply with OK.')  # connection set-up is not what is being measured
+        for name, original, current in corpus(tmp, args.pages):
+            old_prompt = ingest.SUMMARY_PROMPT.format(label='Paper content', content=original)
+            started = time.perf_counter()
+            text = ingest.fit_to_budget(ingest.clean_text(current), args.budget)
+            compress = time.perf_counter() - started
+            new_prompt = ingest.SUMMARY_PROMPT.format(label='Paper content', content=text)
+            old_tokens = ingest.count_tokens(old_prompt)
+            new_tokens = ingest.count_tokens(new_prompt)
+            old_s, new_s = timed_chat(old_prompt), timed_chat(new_prompt)
+            rows.append({
+                'paper': name,
+                'old_tokens': old_tokens,
+                'new_tokens': new_tokens,
+                'saved': f'{1 - new_tokens / old_tokens:.0%}',
+                'compress_ms': round(compress * 1000, 1),
+                'old_llm_s': round(old_s, 2),
+                'new_llm_s': round(new_s + compress, 2),
+            })
+    print(f"chat: {'live ' + ingest.MODEL if args.live else 'stub'}, budget: {args.budget}, "
+          f"token counts: {'tiktoken' if ingest._encoding(ingest.MODEL) else 'estimated'}")
+    print_table(rows, list(rows[0]))
+    old, new = sum(r['old_tokens'] for r in rows), sum(r['new_tokens'] for r in rows)
+    print(f'total: {old} -> {new} prompt tokens ({1 - new / old:.0%} saved)')
+
+
+if __name__ == '__main__':
+    main()
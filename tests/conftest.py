@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import openai
+import pytest
+
+# Configure the app before it is imported: no shared /tmp state, no real API key
+_state = tempfile.mkdtemp(prefix='paper-summarizer-tests-')
+os.environ.update(
+    OPENAI_API_KEY='test',
+    CACHE_BACKEND='memory',
+    JOB_QUEUE='memory',
+    INDEX_DIR=os.path.join(_state, 'index'),
+    PDF_WORKERS='2',
+)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'api'))
+
+import ingest as ingest_module  # noqa: E402
+from tests.helpers import make_html, make_pdf, serve_directory, stub_chat_server  # noqa: E402
+
+
+@pytest.fixture
+def ingest():
+    return ingest_module
+
+
+@pytest.fixture
+def client():
+    return ingest_module.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def chat_server():
+    """A stub chat completions API that the app's OpenAI client talks to."""
+    with stub_chat_server() as server:
+        base_url, openai.base_url = openai.base_url, server.base_url
+        try:
+            yield server
+        finally:
+            openai.base_url = base_url
+
+
+@pytest.fixture(scope='session')
+def papers(tmp_path_factory):
+    """Base URL of a local server with paper-<seed>.pdf for seeds 0-9 and article-<seed>.html."""
+    directory = tmp_path_factory.mktemp('papers')
+    for seed in range(10):
+        make_pdf(str(directory / f'paper-{seed}.pdf'), seed=seed)
+        make_html(str(directory / f'article-{seed}.html'), seed=100 + seed)
+    with serve_directory(str(directory)) as base:
+        yield base
@@ -0,0 +1,203 @@
+"""Fixture documents and local HTTP servers shared by the tests and benchmarks."""
+import functools
+import json
+import random
+import textwrap
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import fitz  # PyMuPDF
+
+SUMMARY = (
+    '# Motivation\nWhy it matters.\n\n# Key contributions\nWhat is new.\n\n'
+    '# Methods\nHow it works.\n\n# Results\nHow well.\n\n# Limitations\nWhat is missing.\n'
+)
+
+_WORDS = (
+    'model training data attention layer gradient sparse retrieval benchmark accuracy '
+    'latency transformer encoder decoder token memory baseline ablation corpus dataset '
+    'objective optimizer schedule batch inference evaluation variance robust scaling '
+    'graph kernel convex bound proof lemma theorem regret bandit policy reward agent '
+    'protein molecule sequence structure folding binding energy docking ligand assay '
+    'image pixel convolution segmentation detection camera depth render texture video '
+    'speech audio phoneme acoustic spectrogram speaker language parsing syntax semantic '
+    'query index database transaction cache storage replica consensus throughput network '
+    'privacy attack defense adversarial robustness certified noise differential federated '
+    'quantum circuit qubit error correction gate simulation hamiltonian annealing photon'
+).split()
+# Each seed writes with its own vocabulary so different fixtures are not near-duplicates
+_VOCABULARY_SIZE = 24
+
+# Wrapped body lines that start with back-matter words but are not headings
+DECOY_LINES = (
+    'References to earlier work are listed in',
+    'Appendix B gives the full derivation of',
+    'Bibliography entries were deduplicated and',
+)
+
+
+def _paragraph(rng: random.Random, words: int = 60, vocabulary: list = _WORDS) -> str:
+    text = ' '.join(rng.choice(vocabulary) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paper_sections(pages: int = 12, seed: int = 0) -> list:
+    """(heading, paragraphs) pairs of a synthetic paper about pages long."""
+    rng = random.Random(seed)
+    vocabulary = rng.sample(_WORDS, _VOCABULARY_SIZE)
+    paragraph = functools.partial(_paragraph, vocabulary=vocabulary)
+    per_section = max(1, pages * 6 // 7)
+    body = [
+        ('Abstract', [paragraph(rng, 80)]),
+        ('1 Introduction', [paragraph(rng) for _ in range(per_section)]),
+        ('2 Related Work', [paragraph(rng) for _ in range(per_section)]),
+        ('3 Method', [paragraph(rng) for _ in range(per_section)]),
+        ('4 Experiments', [paragraph(rng) for _ in range(per_section)]),
+        ('5 Results', [paragraph(rng) for _ in range(per_section)]),
+        ('6 Conclusion', [paragraph(rng) for _ in range(per_section)]),
+        ('References', [f'[{i}] A. Author. {paragraph(rng, 12)}' for i in range(per_section * 3)]),
+        ('Appendix A', [paragraph(rng) for _ in range(per_section)]),
+    ]
+    # Decoys sit at the start of wrapped lines in the middle of body paragraphs
+    for (_, paragraphs), decoy in zip(body[1:4], DECOY_LINES):
+        paragraphs[0] = f'{paragraphs[0]}\n{decoy} {paragraph(rng, 20)}'
+    return body
+
+
+def make_pdf(path: str, pages: int = 12, seed: int = 0,
+             header: str = 'Proceedings of the Workshop on Tests 2026') -> str:
+    """Write a paper-like PDF with a running header and page numbers to path."""
+    doc = fitz.open()
+    blocks = [('A Synthetic Paper for Testing', 12)]
+    for heading, paragraphs in paper_sections(pages, seed):
+        blocks.append((heading, 11))
+        blocks.extend((text, 9) for text in paragraphs)
+    page, y, number = None, 0, 0
+    for text, fontsize in blocks:
+        # Paragraphs are laid out as text boxes so MuPDF sees them as blocks of wrapped lines
+        height = (len(textwrap.wrap(text, 95)) + 1) * fontsize * 1.3
+        if page is None or y + height > 770:
+            number += 1
+            page = doc.new_page()
+            page.insert_text((72, 40), header, fontsize=8)
+            page.insert_text((300, 810), str(number), fontsize=8)
+            y = 60
+        overflow = page.insert_textbox(fitz.Rect(72, y, 540, y + height), text, fontsize=fontsize)
+        assert overflow >= 0, 'text box too small'
+        y += height + fontsize
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_html(path: str, pages: int = 12, seed: int = 0, pdf_url: str = None) -> str:
+    """Write an article page with navigation, scripts, sidebar and a bibliography to path."""
+    sections = paper_sections(pages, seed)
+    article = ''.join(
+        f'<h2>{heading}</h2>' + ''.join(f'<p>{text}</p>' for text in paragraphs)
+        for heading, paragraphs in sections if heading not in ('References', 'Appendix A')
+    )
+    references = ''.join(f'<li>{text}</li>' for heading, paragraphs in sections
+                         if heading == 'References' for text in paragraphs)
+    meta = f'<meta name="citation_pdf_url" content="{pdf_url}">' if pdf_url else ''
+    nav = ''.join(f'<li><a href="/p/{i}">Related paper {i}</a></li>' for i in range(200))
+    html = (
+        f'<!doctype html><html><head><title>A Synthetic Paper</title>{meta}'
+        '<style>body { font-family: serif; } ' + '.x { color: red; } ' * 200 + '</style>'
+        '<script>' + 'var tracking = {};' * 500 + '</script></head><body>'
+        f'<header><nav><ul>{nav}</ul></nav></header>'
+        f'<main><article><h1>A Synthetic Paper for Testing</h1>{article}'
+        f'<section class="references"><h2>References</h2><ol>{references}</ol></section>'
+        '</article></main>'
+        '<aside>' + '<p>Sponsored content about something else.</p>' * 50 + '</aside>'
+        '<footer>Copyright 2026</footer></body></html>'
+    )
+    with open(path, 'w') as f:
+        f.write(html)
+    return path
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+@contextmanager
+def _running(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _FileHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory: str):
+    """Serve directory over HTTP on a free local port; yields the base URL."""
+    server = _QuietServer(('127.0.0.1', 0), partial(_FileHandler, directory=directory))
+    with _running(server):
+        yield f'http://127.0.0.1:{server.server_port}'
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    """Answers chat completions, streamed or not, with a fixed summary."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][0]['content']
+        self.server.prompts.append(prompt)
+        usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(SUMMARY) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        # Optional delay proportional to prompt size, standing in for prefill time
+        time.sleep(self.server.seconds_per_1k_tokens * usage['prompt_tokens'] / 1000)
+        base = {'id': 'chatcmpl-test', 'created': 0, 'model': body['model']}
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for i in range(0, len(SUMMARY), 16):
+                self._event(dict(base, object='chat.completion.chunk', choices=[
+                    {'index': 0, 'delta': {'content': SUMMARY[i:i + 16]}, 'finish_reason': None}
+                ]))
+            self._event(dict(base, object='chat.completion.chunk', choices=[], usage=usage))
+            self.wfile.write(b'data: [DONE]\n\n')
+            return
+        data = json.dumps(dict(base, object='chat.completion', usage=usage, choices=[
+            {'index': 0, 'message': {'role': 'assistant', 'content': SUMMARY},
+             'finish_reason': 'stop'}
+        ])).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _event(self, payload: dict):
+        self.wfile.write(f'data: {json.dumps(payload)}\n\n'.encode())
+        self.wfile.flush()
+
+
+@contextmanager
+def stub_chat_server(seconds_per_1k_tokens: float = 0.0):
+    """A local OpenAI-compatible chat completions endpoint; yields the server.
+
+    ``server.base_url`` is the API base URL and ``server.prompts`` records each prompt.
+    """
+    server = _QuietServer(('127.0.0.1', 0), _ChatHandler)
+    server.prompts = []
+    server.seconds_per_1k_tokens = seconds_per_1k_tokens
+    server.base_url = f'http://127.0.0.1:{server.server_port}/v1'
+    with _running(server):
+        yield server
@@ -0,0 +1,55 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ingest
+
+
+@pytest.mark.parametrize('urls', [
+    None, [], 'https://example.com/a.pdf', ['https://example.com/a.pdf', {'url': 'x'}],
+    ['https://example.com/a.pdf', None], ['https://example.com/a.pdf', '  '], [1, 2],
+])
+def test_batch_rejects_anything_but_non_empty_url_strings(client, urls):
+    resp = client.post('/api/ingest/batch', json={'urls': urls})
+    assert resp.status_code == 400
+
+
+def test_batch_streams_one_line_per_unique_url(client, monkeypatch):
+    def fake_ingest(url, mode, kind):
+        if 'bad' in url:
+            raise ValueError('not a paper')
+        return {'markdown': f'summary of {url}', 'cache': 'miss', 'mode': mode}
+
+    monkeypatch.setattr(ingest, 'ingest_url', fake_ingest)
+    urls = ['https://example.com/a.pdf', 'https://example.com/bad', 'https://example.com/a.pdf']
+    resp = client.post('/api/ingest/batch', json={'urls': urls, 'mode': 'single'})
+    lines = {line['url']: line for line in map(json.loads, resp.get_data(as_text=True).splitlines())}
+    assert set(lines) == {'https://example.com/a.pdf', 'https://example.com/bad'}
+    assert lines['https://example.com/a.pdf']['status'] == 'ok'
+    assert lines['https://example.com/a.pdf']['mode'] == 'single'
+    assert lines['https://example.com/bad'] == {
+        'url': 'https://example.com/bad', 'status': 'error', 'error': 'ValueError: not a paper',
+    }
+
+
+def test_batch_cancels_unstarted_papers_when_the_client_disconnects(client, monkeypatch):
+    started, release = [], threading.Event()
+
+    def slow_ingest(url, mode, kind):
+        started.append(url)
+        if not url.endswith('/0.pdf'):
+            release.wait(5)
+        return {'markdown': '', 'cache': 'miss', 'mode': mode}
+
+    monkeypatch.setattr(ingest, 'ingest_url', slow_ingest)
+    monkeypatch.setattr(ingest, 'batch_pool', ThreadPoolExecutor(max_workers=1))
+    urls = [f'https://example.com/{i}.pdf' for i in range(10)]
+    resp = client.post('/api/ingest/batch', json={'urls': urls}, buffered=False)
+    assert json.loads(next(iter(resp.response)))['url'] == urls[0]
+    resp.close()  # what the server does when the client goes away
+    release.set()
+    time.sleep(0.2)
+    assert started in (urls[:1], urls[:2])
@@ -0,0 +1,113 @@
+import time
+
+from ingest import MemoryCache, RedisCache, SQLiteCache, normalize_url
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=25)
+    cache.set('a', 'x' * 9)
+    cache.set('b', 'x' * 9)
+    cache.get('a')
+    cache.set('c', 'x' * 9)
+    assert cache.get('a') == 'x' * 9
+    assert cache.get('b') is None
+    assert cache.get('c') == 'x' * 9
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(ttl=60)
+    cache.set('a', '1', ttl=-1)
+    cache.set('b', '2')
+    assert cache.get('a') is None
+    assert cache.get('b') == '2'
+    assert cache._size == len('b2')
+
+
+def test_memory_cache_skips_oversized_entries():
+    cache = MemoryCache(max_bytes=10)
+    cache.set('a', '1')
+    cache.set('b', 'x' * 20)
+    assert cache.get('b') is None
+    assert cache.get('a') == '1'
+
+
+def test_memory_cache_replaces_entries_without_leaking_size():
+    cache = MemoryCache(max_bytes=100)
+    for value in ('short', 'a longer value', 'v'):
+        cache.set('key', value)
+    assert cache.get('key') == 'v'
+    assert cache._size == len('keyv')
+
+
+def test_sqlite_cache_evicts_expired_then_least_recently_read(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_bytes=25)
+    cache.set('old', 'x' * 7, ttl=-1)
+    cache.set('a', 'x' * 9)
+    time.sleep(0.01)
+    cache.set('b', 'x' * 9)
+    time.sleep(0.01)
+    cache.get('a')
+    cache.set('c', 'x' * 9)
+    assert cache.get('old') is None
+    assert cache.get('b') is None
+    assert cache.get('a') == 'x' * 9
+    assert cache.get('c') == 'x' * 9
+
+
+def test_sqlite_cache_persists_across_connections(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    SQLiteCache(path).set('key', 'value')
+    assert SQLiteCache(path).get('key') == 'value'
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the part of the redis client RedisCache uses."""
+
+    def __init__(self):
+        self.data = {}  # key -> (bytes value, expires)
+        self.now = 0.0
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= self.now:
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value.encode() if isinstance(value, str) else value,
+                          None if ex is None else self.now + ex)
+
+
+def test_redis_cache_prefixes_keys_and_decodes_values():
+    client = FakeRedis()
+    cache = RedisCache(client, prefix='ps:')
+    cache.set('summary:abc', 'Résumé')
+    assert list(client.data) == ['ps:summary:abc']
+    assert cache.get('summary:abc') == 'Résumé'
+    assert cache.get('missing') is None
+
+
+def test_redis_cache_sets_ttls_with_ex():
+    client = FakeRedis()
+    cache = RedisCache(client, ttl=100)
+    cache.set('a', '1')
+    cache.set('b', '2', ttl=10)
+    assert client.data['paper-summarizer:a'][1] == 100
+    assert client.data['paper-summarizer:b'][1] == 10
+    client.now = 50
+    assert cache.get('a') == '1' and cache.get('b') is None
+
+
+def test_normalize_url_canonicalizes_case_ports_and_tracking_params():
+    assert normalize_url(' HTTPS://ArXiv.org:443/abs/1234.5678/?utm_source=x&b=2&a=1 ') \
+        == 'https://arxiv.org/abs/1234.5678?a=1&b=2'
+    assert normalize_url('http://example.com:80/paper.pdf#page=2') \
+        == 'http://example.com/paper.pdf'
+
+
+def test_normalize_url_keeps_meaningful_differences():
+    assert normalize_url('http://example.com:8080/p') == 'http://example.com:8080/p'
+    assert normalize_url('https://openreview.net/pdf?id=abc') \
+        != normalize_url('https://openreview.net/pdf?id=abd')
+    assert normalize_url('https://example.com/Paper.PDF') == 'https://example.com/Paper.PDF'
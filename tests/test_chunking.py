@@ -0,0 +1,45 @@
+from ingest import chunk_text, estimate_tokens, split_sections
+
+
+def test_split_sections_at_numbered_and_named_headings():
+    text = 'Title\n\nAbstract\nWe study x.\n1 Introduction\nIt matters.\n2.1 Setup\nDetails.\n'
+    assert [heading for heading, _ in split_sections(text)] \
+        == ['', 'Abstract', '1 Introduction', '2.1 Setup']
+
+
+def test_split_sections_ignores_sentences():
+    text = 'Methods are compared below.\n3 of the runs failed, see table.\n'
+    assert split_sections(text) == [('', text)]
+
+
+def test_chunks_fit_budget_and_keep_all_text():
+    text = ''.join(f'{i} Section\n' + 'word ' * 300 + '\n\n' for i in range(1, 20))
+    chunks = chunk_text(text, max_tokens=500)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+    assert ''.join(chunks).split() == text.split()
+
+
+def test_chunks_break_at_section_headings():
+    sections = [f'{i} Section\n' + 'word ' * 200 + '\n' for i in range(1, 5)]
+    chunks = chunk_text(''.join(sections), max_tokens=300)
+    assert [chunk.splitlines()[0] for chunk in chunks] == [f'{i} Section' for i in range(1, 5)]
+
+
+def test_oversized_sections_split_at_paragraphs_lines_then_characters():
+    paragraphs = '\n\n'.join('line ' * 50 for _ in range(10))
+    one_line = 'x' * 10_000
+    for text in (paragraphs, one_line):
+        chunks = chunk_text(text, max_tokens=100)
+        assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+        assert ''.join(chunks) == text
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text('A short paper.\n') == ['A short paper.\n']
+
+
+def test_sections_rejoin_to_the_original_text():
+    text = 'Title\n1 Introduction\nIt matters.\n2 Method  \nDetails.\n'
+    assert split_sections(text)[1] == ('1 Introduction', 'It matters.\n')
+    assert ''.join(chunk_text(text, max_tokens=5)) == text.replace('  \n', '\n')
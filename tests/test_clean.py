@@ -0,0 +1,148 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import ingest
+
+from ingest import (
+    _take_text, clean_text, count_tokens, extract_html, fit_to_budget, iter_pdf_pages,
+    split_sections,
+)
+from tests.helpers import DECOY_LINES, make_pdf
+
+BODY = 'Body text of the paper that goes on for a while.\n' * 20
+
+
+def _paper(*sections: str) -> str:
+    return 'Title\n\n' + '\n\n'.join(sections) + '\n'
+
+
+@pytest.mark.parametrize('line', [
+    'References to earlier work are listed in',
+    'Bibliography entries were collected from',
+    'references and citations are listed in the',
+    'Appendix B gives the full derivation of the',
+    'Acknowledgements are due to the reviewers who',
+])
+def test_wrapped_body_lines_are_not_back_matter(line):
+    for text in (
+        _paper(f'1 Introduction\n{BODY}{line}\nthe supplementary material.', '2 Method\n' + BODY),
+        # Even after a blank line, a line that continues is not a heading
+        _paper('1 Introduction\n' + BODY, f'{line}\nthe supplementary material.\n{BODY}',
+               '2 Method\n' + BODY),
+    ):
+        cleaned = clean_text(text)
+        assert line in cleaned
+        assert cleaned.endswith(BODY.strip())
+
+
+@pytest.mark.parametrize('line', DECOY_LINES + ('Results show that the method works',))
+def test_wrapped_body_lines_do_not_start_sections(line):
+    assert [h for h, _ in split_sections(f'1 Introduction\n{BODY}{line}\nmore text.\n')] \
+        == ['1 Introduction']
+
+
+@pytest.mark.parametrize('heading', [
+    'Results', 'Results and Analysis', 'Conclusions and Future Work', 'Appendix B',
+    'Related Work', 'Acknowledgements', '4.2 Ablations', 'EXPERIMENTAL SETUP',
+])
+def test_headings_start_sections(heading):
+    assert [h for h, _ in split_sections(f'Intro text.\n{heading}\n{BODY}')] == ['', heading]
+
+
+@pytest.mark.parametrize('heading', ['References', 'REFERENCES', '7 References', 'VII. Bibliography'])
+def test_standalone_references_heading_ends_the_paper(heading):
+    text = _paper('1 Introduction\n' + BODY, '2 Method\n' + BODY,
+                  f'{heading}\n[1] A. Author. A paper. 2020.', 'Appendix A\nProofs.')
+    cleaned = clean_text(text)
+    assert cleaned.endswith(BODY.strip())
+    assert 'A. Author' not in cleaned and 'Proofs' not in cleaned
+
+
+def test_references_heading_at_a_page_edge_ends_the_paper():
+    text = f'Title\n1 Introduction\n{BODY}\fReferences\n[1] A. Author. A paper. 2020.\n'
+    assert 'A. Author' not in clean_text(text)
+
+
+def test_references_heading_mid_paragraph_is_kept():
+    text = _paper(f'1 Introduction\n{BODY}References\n{BODY}')
+    assert clean_text(text).count('Body text') == 40
+
+
+def test_references_in_a_table_of_contents_are_kept():
+    text = _paper('Contents', 'References', '1 Introduction\n' + BODY * 3)
+    assert clean_text(text).count('Body text') == 60
+
+
+@pytest.mark.parametrize('heading', ['Appendix', 'Appendix B', '8 Appendix', 'Acknowledgments'])
+def test_dropped_sections_end_at_the_next_heading(heading):
+    text = _paper('1 Introduction\n' + BODY, f'{heading}\nSupplementary proofs.',
+                  '2 Method\n' + BODY)
+    cleaned = clean_text(text)
+    assert 'Supplementary' not in cleaned
+    assert '2 Method' in cleaned and cleaned.count('Body text') == 40
+
+
+def test_page_furniture_and_hyphenation_are_removed():
+    words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta']
+    pages = [
+        f'Journal of Tests, Vol. 3\n\n{i}\n\nOn {word}, the {word} method.\n{word} one.\n'
+        f'{word} two.\nThen {word} is hyphen-\nated here.\n{word} three.\n{word} four.\n'
+        f'More about {word} follows.\n\nPage {i} of 9'
+        for i, word in enumerate(words, 1)
+    ]
+    cleaned = clean_text('\f'.join(pages))
+    assert 'Journal of Tests' not in cleaned and 'Page ' not in cleaned
+    assert cleaned.count('hyphenated here') == 8
+    assert all(f'On {word}, the {word} method.' in cleaned for word in words)
+
+
+def test_clean_text_of_a_generated_pdf(tmp_path):
+    path = make_pdf(str(tmp_path / 'paper.pdf'))
+    text, _ = _take_text(iter_pdf_pages(path))
+    cleaned = clean_text(text)
+    assert '6 Conclusion' in cleaned
+    assert all(decoy in cleaned for decoy in DECOY_LINES)
+    assert 'Proceedings of the Workshop' not in cleaned
+    assert 'A. Author' not in cleaned and 'Appendix A' not in cleaned
+    assert len(cleaned) < len(text) * 0.8
+
+
+def test_clean_text_of_html_drops_back_matter_sections():
+    body = f'<p>{BODY}</p>'
+    soup = BeautifulSoup(
+        f'<article><h1>Title</h1><h2>1 Introduction</h2>{body * 3}<h2>2 Method</h2>{body}'
+        '<section><h2>Acknowledgements</h2><p>We thank the reviewers.</p></section>'
+        '<h2>Appendix A</h2><p>Supplementary proofs.</p>'
+        '<h2>3 Conclusion</h2><p>The method works.</p>'
+        '<section><h2>References</h2><ol><li>[1] A. Author. A paper. 2020.</li></ol></section>'
+        '</article>',
+        ingest.HTML_PARSER,
+    )
+    cleaned = clean_text(extract_html(soup))
+    assert cleaned.startswith('Title\n\n1 Introduction')
+    assert cleaned.endswith('3 Conclusion\n\nThe method works.')
+    for back_matter in ('reviewers', 'Supplementary', 'A. Author'):
+        assert back_matter not in cleaned
+
+def test_fit_to_budget_leaves_short_text_alone():
+    text = _paper('1 Introduction\n' + BODY)
+    assert fit_to_budget(text, 10_000) is text
+
+
+def test_fit_to_budget_trims_related_work_before_the_introduction():
+    text = _paper('Abstract\n' + BODY, '1 Introduction\n' + BODY, '2 Related Work\n' + BODY * 3,
+                  '3 Method\n' + BODY, '4 Conclusion\n' + BODY)
+    budget = count_tokens(text) - count_tokens(BODY * 2)
+    fitted = fit_to_budget(text, budget)
+    assert count_tokens(fitted) <= budget * 1.01
+    related = fitted.split('2 Related Work\n')[1].split('3 Method')[0]
+    assert len(BODY) / 2 < len(related) < len(BODY) * 1.5
+    for heading in ('Abstract', '1 Introduction', '3 Method', '4 Conclusion'):
+        assert f'{heading}\n{BODY}' in fitted
+
+
+def test_fit_to_budget_keeps_headings_when_trimming_everything():
+    text = _paper(*(f'{i} Section\n{BODY}' for i in range(1, 6)))
+    fitted = fit_to_budget(text, 20)
+    assert all(f'{i} Section\n' in fitted for i in range(1, 6))
+    assert fitted.count('Body text') <= 1
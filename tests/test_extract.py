@@ -0,0 +1,56 @@
+import os
+import signal
+
+import fitz
+
+import ingest
+from ingest import _get_pdf_pool, _take_text, iter_pdf_pages
+from pdf_extract import page_text
+from tests.helpers import make_pdf
+
+
+def test_pool_extraction_matches_serial_extraction(tmp_path):
+    path = make_pdf(str(tmp_path / 'paper.pdf'), pages=40)
+    with fitz.open(path) as doc:
+        expected = [page_text(page) for page in doc]
+    assert len(expected) > 8  # enough pages to use the pool
+    assert list(iter_pdf_pages(path)) == expected
+
+
+def test_pool_does_not_fork():
+    pool = _get_pdf_pool()
+    assert pool is not None
+    assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+
+
+def test_pool_workers_do_not_load_the_app():
+    loaded = _get_pdf_pool().submit(eval, "sorted(__import__('sys').modules)").result()
+    assert 'pdf_extract' in loaded or 'fitz' in loaded or 'pymupdf' in loaded
+    assert not {'ingest', 'flask', 'openai', 'numpy'} & set(loaded)
+
+
+def test_extraction_survives_a_killed_worker(tmp_path):
+    path = make_pdf(str(tmp_path / 'paper.pdf'), pages=40)
+    expected = list(iter_pdf_pages(path))
+    pool = _get_pdf_pool()
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+    assert list(iter_pdf_pages(path)) == expected
+    assert ingest._pdf_pool is not pool
+    # Later PDFs get a working pool again
+    assert list(iter_pdf_pages(path)) == expected
+    assert ingest._pdf_pool is not None and ingest._pdf_pool is not pool
+
+
+def test_take_text_stops_consuming_pages_at_max_chars():
+    consumed = []
+
+    def pages():
+        for i in range(100):
+            consumed.append(i)
+            yield 'x' * 10
+
+    text, count = _take_text(pages(), max_chars=35)
+    assert len(text) == 35
+    assert count == 4
+    assert len(consumed) == 4
+    assert text.count('\f') == 3
@@ -0,0 +1,140 @@
+"""End to end: papers served over local HTTP, a stub chat API, and the app's metrics and traces."""
+import functools
+import json
+import logging
+import time
+
+import pytest
+
+import ingest
+
+from tests.helpers import SUMMARY
+
+
+def _metrics(client) -> dict:
+    resp = client.get('/api/metrics')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    samples = {}
+    for line in resp.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def _delta(before: dict, after: dict, name: str) -> float:
+    return after.get(name, 0) - before.get(name, 0)
+
+
+@pytest.fixture
+def traces(caplog):
+    """The JSON trace record of each ingest, in order."""
+    caplog.set_level(logging.INFO, logger='paper_summarizer.trace')
+    return lambda: [json.loads(r.getMessage()) for r in caplog.records
+                    if r.name == 'paper_summarizer.trace']
+
+
+def test_pdf_ingest_spans_and_metrics(client, chat_server, papers, traces):
+    before = _metrics(client)
+    resp = client.post('/api/ingest', json={'url': f'{papers}/paper-0.pdf', 'mode': 'single'})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert resp.headers['X-Cache'] == 'miss'
+    assert resp.get_json()['markdown'] == SUMMARY
+
+    record = traces()[-1]
+    assert record['kind'] == 'json' and record['status'] == 'ok' and record['cache'] == 'miss'
+    spans = {span['stage']: span for span in record['spans']}
+    assert [span['stage'] for span in record['spans']] == [
+        'download', 'pdf_parse', 'fetch', 'compress', 'index_lookup',
+        'rate_limit_wait', 'llm', 'summarize', 'index_add',
+    ]
+    assert spans['download']['bytes'] > 0
+    assert spans['pdf_parse']['pages'] > 1
+    assert spans['llm']['prompt_tokens'] > 1000
+    assert all(span['seconds'] >= 0 for span in record['spans'])
+
+    after = _metrics(client)
+    for stage in spans:
+        assert _delta(before, after, f'paper_stage_seconds_count{{stage="{stage}"}}') == 1
+    assert _delta(before, after, 'paper_llm_tokens_total{kind="prompt"}') \
+        == spans['llm']['prompt_tokens']
+    assert _delta(before, after, 'paper_download_bytes_sum') == spans['download']['bytes']
+    assert _delta(before, after, 'paper_pdf_pages_sum') == spans['pdf_parse']['pages']
+    assert _delta(before, after, 'paper_ingests_total{kind="json",status="ok"}') == 1
+    assert _delta(before, after, 'paper_cache_total{outcome="miss"}') == 1
+    assert after['paper_ingest_seconds_bucket{kind="json",le="+Inf"}'] \
+        == after['paper_ingest_seconds_count{kind="json"}']
+
+    resp = client.post('/api/ingest', json={'url': f'{papers}/paper-0.pdf', 'mode': 'single'})
+    assert resp.headers['X-Cache'] == 'hit'
+    assert [span['stage'] for span in traces()[-1]['spans']] == []
+    final = _metrics(client)
+    assert _delta(after, final, 'paper_cache_total{outcome="hit"}') == 1
+    assert _delta(after, final, 'paper_stage_seconds_count{stage="llm"}') == 0
+
+
+def test_html_ingest_spans(client, chat_server, papers, traces):
+    resp = client.post('/api/ingest', json={'url': f'{papers}/article-0.html'})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert resp.get_json()['extraction']['format'] == 'html'
+    stages = [span['stage'] for span in traces()[-1]['spans']]
+    assert stages[:4] == ['download', 'html_parse', 'html_extract', 'fetch']
+
+
+def test_mapreduce_ingest_traces_each_chat_call(client, chat_server, papers, traces, monkeypatch):
+    monkeypatch.setattr(ingest, 'chunk_text', functools.partial(ingest.chunk_text, max_tokens=2000))
+    calls = len(chat_server.prompts)
+    resp = client.post('/api/ingest', json={'url': f'{papers}/paper-1.pdf', 'mode': 'mapreduce'})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert resp.get_json()['mode'] == 'mapreduce'
+    stages = [span['stage'] for span in traces()[-1]['spans']]
+    assert stages.count('llm') == len(chat_server.prompts) - calls > 2
+    assert 'map' in stages and 'reduce' in stages
+    assert stages.index('map') < stages.index('reduce')
+
+
+def test_streamed_ingest(client, chat_server, papers, traces):
+    resp = client.post('/api/ingest?stream=1', json={'url': f'{papers}/paper-2.pdf'})
+    assert resp.mimetype == 'text/event-stream'
+    events = []
+    for block in resp.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    assert events[0] == ('status', {'stage': 'fetch'})
+    assert ''.join(data['content'] for event, data in events if event == 'delta') == SUMMARY
+    assert [data['title'] for event, data in events if event == 'section'] \
+        == ['Motivation', 'Key contributions', 'Methods', 'Results', 'Limitations']
+    done = events[-1][1]
+    assert events[-1][0] == 'done' and done['cache'] == 'miss'
+    assert done['usage']['prompt_tokens'] > 1000
+    assert 'first_token' in done['timings']
+    record = traces()[-1]
+    assert record['kind'] == 'stream' and record['status'] == 'ok'
+    assert 'llm' in [span['stage'] for span in record['spans']]
+
+
+def test_failed_ingest_is_counted(client, chat_server, papers, traces):
+    before = _metrics(client)
+    resp = client.post('/api/ingest', json={'url': f'{papers}/missing.pdf'})
+    assert resp.status_code == 500
+    record = traces()[-1]
+    assert record['status'] == 'error' and 'HTTPError' in record['error']
+    assert _delta(before, _metrics(client), 'paper_ingests_total{kind="json",status="error"}') == 1
+
+
+def test_async_job_runs_through_the_worker_pool(client, chat_server, papers, traces):
+    before = _metrics(client)
+    resp = client.post('/api/ingest?async=1', json={'url': f'{papers}/paper-3.pdf'})
+    assert resp.status_code == 202
+    location = resp.headers['Location']
+    deadline = time.time() + 30
+    while (job := client.get(location).get_json())['status'] in ('queued', 'running'):
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert job['status'] == 'done' and job['result']['markdown'] == SUMMARY
+    after = _metrics(client)
+    assert _delta(before, after, 'paper_jobs_total{outcome="queued"}') == 1
+    assert _delta(before, after, 'paper_jobs_total{outcome="done"}') == 1
+    assert _delta(before, after, 'paper_job_wait_seconds_count') == 1
+    assert any(record['kind'] == 'job' for record in traces())
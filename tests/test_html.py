@@ -0,0 +1,54 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import ingest
+from ingest import extract_html, fetch_text, resolve_url
+from tests.helpers import make_html, make_pdf, serve_directory
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://arxiv.org/abs/2401.01234v2', 'https://arxiv.org/pdf/2401.01234v2'),
+    ('https://openreview.net/forum?id=AbC123', 'https://openreview.net/pdf?id=AbC123'),
+    ('https://aclanthology.org/2023.acl-long.1/', 'https://aclanthology.org/2023.acl-long.1.pdf'),
+    ('https://aclanthology.org/P19-1001', 'https://aclanthology.org/P19-1001.pdf'),
+    ('https://example.com/abs/123', 'https://example.com/abs/123'),
+])
+def test_landing_pages_resolve_to_pdfs(url, expected):
+    assert resolve_url(url) == expected
+
+
+def test_extract_html_keeps_the_article_only(tmp_path):
+    with open(make_html(str(tmp_path / 'page.html'))) as f:
+        soup = BeautifulSoup(f, ingest.HTML_PARSER)
+    text = extract_html(soup)
+    assert text.startswith('A Synthetic Paper for Testing')
+    assert '6 Conclusion' in text
+    for boilerplate in ('Related paper 1', 'tracking', 'Sponsored', 'Copyright', 'A. Author'):
+        assert boilerplate not in text
+
+
+def test_extract_html_falls_back_to_the_densest_block():
+    paragraphs = ''.join(f'<p>{"Paper text. " * 20}</p>' for _ in range(5))
+    soup = BeautifulSoup(
+        f'<body><div id="menu"><p>Home</p></div><div id="content">{paragraphs}</div></body>',
+        ingest.HTML_PARSER,
+    )
+    text = extract_html(soup)
+    assert text.startswith('Paper text.') and 'Home' not in text
+
+
+def test_fetch_text_follows_citation_pdf_url_from_thin_landing_pages(tmp_path):
+    make_pdf(str(tmp_path / 'paper.pdf'))
+    (tmp_path / 'landing.html').write_text(
+        '<html><head><meta name="citation_pdf_url" content="/paper.pdf"></head>'
+        '<body><main><h1>A Synthetic Paper</h1><p>Only the abstract.</p></main></body></html>'
+    )
+    make_html(str(tmp_path / 'full.html'), pdf_url='/paper.pdf')
+    with serve_directory(str(tmp_path)) as base:
+        stats = {}
+        assert '6 Conclusion' in fetch_text(f'{base}/landing.html', stats)
+        assert stats['format'] == 'pdf'
+        stats = {}
+        fetch_text(f'{base}/full.html', stats)
+        assert stats['format'] == 'html'
+        assert 0 < stats['tokens'] < stats['raw_tokens']
@@ -0,0 +1,125 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import ingest
+from ingest import SummaryIndex, embed
+from tests.helpers import make_pdf, serve_directory
+
+
+def _text(i: int) -> str:
+    return f'Paper {i} about topic{i} and subject{i}. ' + f'keyword{i} finding{i} ' * 20
+
+
+def _count(index) -> int:
+    return index._conn.execute('SELECT COUNT(*) FROM papers').fetchone()[0]
+
+
+def test_search_ranks_papers_and_lists_each_once(tmp_path):
+    index = SummaryIndex(str(tmp_path))
+    for i in range(5):
+        index.add(f'https://example.com/{i}', f'digest{i}', _text(i), f'summary {i}', 'single')
+    index.add('https://example.com/2', 'digest2', _text(2), 'summary 2 again', 'mapreduce')
+    results = index.search(_text(2), k=3)
+    assert [r['url'] for r in results][0] == 'https://example.com/2'
+    assert results[0]['markdown'] == 'summary 2 again'  # the newest summary of the paper
+    assert len({r['url'] for r in results}) == 3
+    assert index.search('anything', k=0) == []
+    assert SummaryIndex(str(tmp_path / 'empty')).search('anything') == []
+
+
+def test_summaries_are_keyed_by_model_prompt_version_and_mode(tmp_path, monkeypatch):
+    index = SummaryIndex(str(tmp_path))
+    index.add('https://example.com/a', 'digest', _text(0), 'v2 single', 'single')
+    index.add('https://example.com/a', 'digest', _text(0), 'v2 single again', 'single')
+    assert _count(index) == 1
+    index.add('https://example.com/a', 'digest', _text(0), 'v2 mapreduce', 'mapreduce')
+    monkeypatch.setattr(ingest, 'PROMPT_VERSION', '99')
+    index.add('https://example.com/a', 'digest', _text(0), 'v99 single', 'single')
+    monkeypatch.setattr(ingest, 'MODEL', 'other-model')
+    index.add('https://example.com/a', 'digest', _text(0), 'other single', 'single')
+    assert _count(index) == 4 == len(index)
+    assert os.path.getsize(index._vectors_path) == 4 * index.dim * 4
+
+
+def test_find_duplicate_only_returns_current_summaries(tmp_path, monkeypatch):
+    index = SummaryIndex(str(tmp_path))
+    index.add('https://example.com/a', 'digest', _text(0), 'v2 single', 'single')
+    vector = embed(_text(0))
+    assert index.find_duplicate(vector, 'single')['markdown'] == 'v2 single'
+    assert index.find_duplicate(vector, 'mapreduce') is None
+    assert index.find_duplicate(embed(_text(1)), 'single') is None
+    monkeypatch.setattr(ingest, 'PROMPT_VERSION', '99')
+    assert index.find_duplicate(vector, 'single') is None
+    monkeypatch.undo()
+    monkeypatch.setattr(ingest, 'MODEL', 'other-model')
+    assert index.find_duplicate(vector, 'single') is None
+
+
+def test_opening_the_index_keeps_appends_in_progress(tmp_path):
+    index = SummaryIndex(str(tmp_path))
+    index.add('https://example.com/0', 'digest0', _text(0), 'summary', 'single')
+    # Another process has written its vector but not yet committed the row
+    with open(index._vectors_path, 'ab') as f:
+        f.write(embed(_text(1)).tobytes())
+    size = os.path.getsize(index._vectors_path)
+    reopened = SummaryIndex(str(tmp_path))
+    assert os.path.getsize(index._vectors_path) == size
+    assert len(reopened) == 1
+    assert [r['url'] for r in reopened.search(_text(1))] == ['https://example.com/0']
+
+
+def test_appends_overwrite_vectors_of_crashed_appends(tmp_path):
+    index = SummaryIndex(str(tmp_path))
+    with open(index._vectors_path, 'ab') as f:
+        f.write(np.ones(index.dim, dtype=np.float32).tobytes() * 3)
+    index.add('https://example.com/0', 'digest0', _text(0), 'summary', 'single')
+    assert index.search(_text(0))[0]['score'] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_concurrent_writers_get_their_own_rows(tmp_path):
+    indexes = [SummaryIndex(str(tmp_path)) for _ in range(2)]
+
+    def add(writer):
+        for i in range(writer, 40, 2):
+            indexes[writer].add(f'https://example.com/{i}', f'digest{i}', _text(i), str(i), 'single')
+
+    threads = [threading.Thread(target=add, args=(writer,)) for writer in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reader = SummaryIndex(str(tmp_path))
+    assert len(reader) == 40
+    for i in range(40):
+        best = reader.search(_text(i), k=1)[0]
+        assert best['url'] == f'https://example.com/{i}'
+        assert best['score'] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_near_duplicates_are_reused_only_for_the_current_prompt(
+        client, chat_server, tmp_path, monkeypatch):
+    # Same paper behind different URLs and running heads, so the content hashes differ
+    for name in 'abcd':
+        make_pdf(str(tmp_path / f'{name}.pdf'), seed=42, header=f'Mirror {name} of the paper')
+    with serve_directory(str(tmp_path)) as base:
+        def ingest_pdf(name, mode='single'):
+            resp = client.post('/api/ingest', json={'url': f'{base}/{name}.pdf', 'mode': mode})
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+            return resp.headers['X-Cache'], resp.get_json()
+
+        assert ingest_pdf('a')[0] == 'miss'
+        cache, body = ingest_pdf('b')
+        assert cache == 'hit' and body['duplicate_of'] == f'{base}/a.pdf'
+        assert body['mode'] == 'single'
+
+        assert ingest_pdf('c', mode='mapreduce')[0] == 'miss'
+
+        monkeypatch.setattr(ingest, 'PROMPT_VERSION', '99')
+        cache, body = ingest_pdf('d')
+        assert cache == 'miss' and body['duplicate_of'] is None
+        # The paper's new summary is indexed next to the old one
+        assert ingest.index.find_duplicate(embed(ingest.clean_text(
+            ingest.fetch_text(f'{base}/a.pdf'))), 'single')['url'] == f'{base}/d.pdf'
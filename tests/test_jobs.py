@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import ingest
+from ingest import MemoryJobQueue, SQLiteJobQueue, WorkerPool
+
+
+def _wait_for(queue, job_id, status, timeout=3.0):
+    deadline = time.time() + timeout
+    while queue.get(job_id)['status'] != status and time.time() < deadline:
+        time.sleep(0.02)
+    assert queue.get(job_id)['status'] == status
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def queue(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryJobQueue()
+    return SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'))
+
+
+def test_submit_deduplicates_in_flight_jobs(queue):
+    first = queue.submit('https://Example.com/a.pdf?utm_source=x', 'auto')
+    assert queue.submit('https://example.com/a.pdf', 'auto')['id'] == first['id']
+    assert queue.submit('https://example.com/a.pdf', 'single')['id'] != first['id']
+    queue.claim(timeout=0)
+    assert queue.submit('https://example.com/a.pdf', 'auto')['id'] == first['id']
+    queue.complete(first['id'], {'markdown': 'x'})
+    assert queue.submit('https://example.com/a.pdf', 'auto')['id'] != first['id']
+
+
+def test_claim_is_fifo_and_times_out(queue):
+    ids = [queue.submit(f'https://example.com/{i}.pdf', 'auto')['id'] for i in range(3)]
+    claimed = [queue.claim(timeout=0) for _ in range(3)]
+    assert [job['id'] for job in claimed] == ids
+    assert all(job['status'] == 'running' and job['attempts'] == 1 for job in claimed)
+    started = time.time()
+    assert queue.claim(timeout=0.2) is None
+    assert time.time() - started >= 0.2
+
+
+def test_failed_jobs_retry_at_retry_at(queue):
+    job = queue.submit('https://example.com/a.pdf', 'auto')
+    queue.claim(timeout=0)
+    queue.fail(job['id'], 'ConnectionError: reset', retry_at=time.time() + 0.3)
+    assert queue.get(job['id'])['status'] == 'queued'
+    assert queue.claim(timeout=0) is None
+    retried = queue.claim(timeout=2)
+    assert retried['id'] == job['id'] and retried['attempts'] == 2
+    queue.fail(job['id'], 'ValueError: bad pdf')
+    assert queue.get(job['id'])['status'] == 'failed'
+    assert queue.get(job['id'])['error'] == 'ValueError: bad pdf'
+
+
+def test_complete_stores_result(queue):
+    job = queue.submit('https://example.com/a.pdf', 'auto')
+    queue.claim(timeout=0)
+    queue.complete(job['id'], {'markdown': '# Motivation'})
+    assert queue.get(job['id'])['result'] == {'markdown': '# Motivation'}
+    assert queue.get('missing') is None
+
+
+def test_sqlite_queue_does_not_steal_live_jobs_on_start(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    first = SQLiteJobQueue(path, lease=60)
+    job = first.submit('https://example.com/a.pdf', 'auto')
+    first.claim(timeout=0)
+    second = SQLiteJobQueue(path, lease=60)
+    assert second.claim(timeout=0) is None
+    assert second.get(job['id'])['status'] == 'running'
+
+
+def test_sqlite_queue_reclaims_jobs_whose_lease_lapsed(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    first = SQLiteJobQueue(path, lease=0.3)
+    job = first.submit('https://example.com/a.pdf', 'auto')
+    first.claim(timeout=0)
+    second = SQLiteJobQueue(path, lease=0.3)
+    time.sleep(0.2)
+    first.renew(job['id'])
+    time.sleep(0.2)
+    assert second.claim(timeout=0) is None
+    reclaimed = second.claim(timeout=1)
+    assert reclaimed['id'] == job['id'] and reclaimed['attempts'] == 2
+
+
+def test_workers_renew_leases_of_long_jobs(tmp_path, monkeypatch):
+    path = str(tmp_path / 'jobs.sqlite3')
+    release = threading.Event()
+    monkeypatch.setattr(ingest, 'ingest_url', lambda url, mode, kind: release.wait(5) and {})
+    queue = SQLiteJobQueue(path, lease=0.3)
+    job = queue.submit('https://example.com/a.pdf', 'auto')
+    WorkerPool(queue, workers=1, heartbeat=0.1).start()
+    _wait_for(queue, job['id'], 'running')
+    other = SQLiteJobQueue(path, lease=0.3)
+    assert other.claim(timeout=1) is None
+    release.set()
+    _wait_for(queue, job['id'], 'done')
+    assert queue.get(job['id'])['attempts'] == 1
+
+
+def test_workers_give_up_on_jobs_that_keep_losing_their_lease(tmp_path, monkeypatch):
+    path = str(tmp_path / 'jobs.sqlite3')
+    queue = SQLiteJobQueue(path, lease=0)
+    job = queue.submit('https://example.com/a.pdf', 'auto')
+    for _ in range(2):
+        queue.claim(timeout=0)  # as if the worker died each time
+    monkeypatch.setattr(ingest, 'ingest_url', lambda url, mode, kind: pytest.fail('ran'))
+    WorkerPool(queue, workers=1, max_attempts=2).start()
+    _wait_for(queue, job['id'], 'failed')
+
+
+def test_workers_survive_queue_errors(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'))
+    claim = queue.claim
+    errors = [sqlite3.OperationalError('database is locked')]
+
+    def flaky_claim(*args, **kwargs):
+        if errors:
+            raise errors.pop()
+        return claim(*args, **kwargs)
+
+    monkeypatch.setattr(queue, 'claim', flaky_claim)
+    monkeypatch.setattr(ingest, 'ingest_url', lambda url, mode, kind: {})
+    job = queue.submit('https://example.com/a.pdf', 'auto')
+    WorkerPool(queue, workers=1, backoff=0.05).start()
+    _wait_for(queue, job['id'], 'done')
+    assert not errors
+
+def test_sqlite_queue_deduplicates_across_processes(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    queues = [SQLiteJobQueue(path) for _ in range(4)]  # one connection each, like processes
+    barrier = threading.Barrier(len(queues))
+    ids = set()
+
+    def submit(queue):
+        barrier.wait()
+        for i in range(20):
+            ids.add(queue.submit(f'https://example.com/{i}.pdf', 'auto')['id'])
+
+    threads = [threading.Thread(target=submit, args=(queue,)) for queue in queues]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ids) == 20
+    assert queues[0]._conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0] == 20